@@ -0,0 +1,77 @@
+from collections import deque
+
+
+class RunPath:
+    # Camino compacto: primera posicion + tramos [dx, dy, repeticiones] con el desplazamiento en pixeles.
+    # Un pasillo recto ocupa un solo tramo sea cual sea su longitud, avanzar es O(1) y las
+    # posiciones solo se generan al recorrer el camino.
+    __slots__ = ('head', 'tail', 'runs', 'length')
+
+    def __init__(self, head=None, runs=()):
+        self.head = head  # Primera posicion pendiente (None si el camino esta vacio)
+        self.runs = deque([dx, dy, count] for dx, dy, count in runs)
+        self.length = 0
+        self.tail = head  # Ultima posicion, para poder seguir anadiendo
+        if head is not None:
+            self.length = 1 + sum(run[2] for run in self.runs)
+            x, y = head
+            for dx, dy, count in self.runs:
+                x, y = x + dx * count, y + dy * count
+            self.tail = (x, y)
+
+    @classmethod
+    def from_positions(cls, positions):
+        path = cls()
+        for pos in positions:
+            path.append(pos)
+        return path
+
+    def append(self, pos):
+        if self.head is None:
+            self.head = self.tail = pos
+            self.length = 1
+            return
+        dx, dy = pos[0] - self.tail[0], pos[1] - self.tail[1]
+        if self.runs and self.runs[-1][0] == dx and self.runs[-1][1] == dy:
+            self.runs[-1][2] += 1
+        else:
+            self.runs.append([dx, dy, 1])
+        self.tail = pos
+        self.length += 1
+
+    def peek(self):
+        return self.head
+
+    def advance(self):
+        # Descartar la primera posicion (lo que antes hacia pop(0) sobre la lista)
+        self.length -= 1
+        if not self.runs:
+            self.head = self.tail = None
+            return
+        run = self.runs[0]
+        self.head = (self.head[0] + run[0], self.head[1] + run[1])
+        run[2] -= 1
+        if not run[2]:
+            self.runs.popleft()
+
+    def copy(self):
+        return RunPath(self.head, self.runs)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        if self.head is None:
+            return
+        x, y = self.head
+        yield x, y
+        for dx, dy, count in self.runs:
+            for _ in range(count):
+                x, y = x + dx, y + dy
+                yield x, y
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"RunPath({self.head!r}, {list(map(tuple, self.runs))!r})"
@@ -0,0 +1,152 @@
+import argparse
+import random
+import time
+from array import array
+
+from laberinto2 import Laberinto, TICK_MS
+
+# Codigos de celda en las observaciones
+FLOOR, WALL, ENEMY, COIN, POWER_UP, PLAYER, GOAL = range(7)
+
+# Acciones: quieto, derecha, izquierda, abajo, arriba
+ACTIONS = [(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)]
+
+# Recompensas adicionales a la puntuacion del juego
+WIN_REWARD = 100.0
+LOSE_REWARD = -100.0
+LIFE_LOST_REWARD = -10.0
+
+
+class LaberintoEnv:
+    # Entorno estilo Gym (reset/step) sobre la logica de un nivel, sin ventana ni sonido.
+    # Cada step corresponde a una decision de movimiento del jugador: se simulan los ticks
+    # necesarios hasta que el juego acepta el siguiente movimiento.
+    def __init__(self, level, seed=None):
+        self.level = level
+        self.seed = seed
+        self.game = None
+        self.action_space = len(ACTIONS)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seed = seed
+        if self.game is None:
+            self.game = Laberinto(self.level, headless=True, seed=self.seed)
+        else:
+            # Reinicio instantaneo: se restaura el estado inicial sin volver a leer el mapa
+            self.game.restore(self.game.initial_state)
+            self.game.rng.seed(self.seed)
+        return self.observation()
+
+    @property
+    def observation_shape(self):
+        return (self.game.grid_height, self.game.grid_width)
+
+    def observation(self, out=None, offset=0):
+        # Rejilla de codigos de celda (un byte por celda, fila a fila).
+        # Si se pasa out, se escribe ahi a partir de offset en lugar de crear un buffer nuevo.
+        game = self.game
+        size = len(game.walls)
+        if out is None:
+            out = bytearray(size)
+        out[offset:offset + size] = game.walls
+
+        width, block_size = game.grid_width, game.block_size
+
+        def cell(pos):
+            return offset + (pos[1] // block_size) * width + pos[0] // block_size
+
+        for pos in game.collectibles:
+            out[cell(pos)] = COIN
+        for pos in game.power_ups:
+            out[cell(pos)] = POWER_UP
+        for pos in game.enemy_cells:
+            out[cell(pos)] = ENEMY
+        out[cell(game.goal.topleft)] = GOAL
+        out[cell(game.player.topleft)] = PLAYER
+        return out
+
+    def step(self, action):
+        game = self.game
+        move = ACTIONS[action]
+        score, lives = game.score, game.lives
+
+        while game.running:
+            # Saltar los ticks en los que no pasa nada hasta el turno del jugador (ver Laberinto.next_event_tick)
+            last, delay = game.last_move_time, game.move_delay
+            turn = game.first_tick(lambda now: now - last > delay, int((last + delay) // TICK_MS))
+            idle = min(game.next_event_tick(move), turn) - game.tick - 1
+            if idle:
+                game.skip_ticks(idle)
+            ready = (game.tick + 1) * TICK_MS - game.last_move_time > game.move_delay
+            game.step(move if ready else (0, 0))
+            if ready:
+                if move == (0, 0):
+                    # Quedarse quieto tambien consume el turno de movimiento
+                    game.last_move_time = game.now()
+                break
+
+        reward = float(game.score - score) + LIFE_LOST_REWARD * max(0, lives - game.lives)
+        if game.outcome == 'win':
+            reward += WIN_REWARD
+        elif game.outcome == 'lose':
+            reward += LOSE_REWARD
+        done = not game.running
+
+        info = {'score': game.score, 'lives': game.lives, 'tick': game.tick, 'outcome': game.outcome}
+        return self.observation(), reward, done, info
+
+
+class SyncVecLaberintoEnv:
+    # N LaberintoEnv del mismo nivel avanzados uno tras otro en un bucle, como SyncVectorEnv de Gym:
+    # cada entorno es una partida Laberinto completa y no hay estado compartido entre ellos.
+    # Lo unico comun son los buffers contiguos (bytearray / array) de observaciones, recompensas y
+    # finalizaciones, reutilizados entre pasos; los entornos terminados se reinician solos.
+    def __init__(self, level, num_envs, seed=0):
+        self.num_envs = num_envs
+        self.envs = [LaberintoEnv(level, seed=seed + i) for i in range(num_envs)]
+        self.next_seed = seed + num_envs
+        self.observations = None
+        self.rewards = array('f', [0.0]) * num_envs
+        self.dones = array('B', [0]) * num_envs
+
+    def reset(self):
+        for env in self.envs:
+            env.reset()
+        self.cell_count = len(self.envs[0].game.walls)
+        self.observations = bytearray(self.cell_count * self.num_envs)
+        for i, env in enumerate(self.envs):
+            env.observation(self.observations, i * self.cell_count)
+        return self.observations
+
+    def step(self, actions):
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            _, reward, done, info = env.step(action)
+            self.rewards[i] = reward
+            self.dones[i] = done
+            if done:
+                env.reset(self.next_seed)
+                self.next_seed += 1
+            env.observation(self.observations, i * self.cell_count)
+            infos.append(info)
+        return self.observations, self.rewards, self.dones, infos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rendimiento de N entornos en serie con un agente aleatorio")
+    parser.add_argument("--envs", type=int, default=64)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--level", type=int, default=1)
+    args = parser.parse_args()
+
+    vec_env = SyncVecLaberintoEnv(args.level, args.envs)
+    vec_env.reset()
+    agent = random.Random(0)
+    start = time.perf_counter()
+    episodes = 0
+    for _ in range(args.steps):
+        _, _, dones, _ = vec_env.step([agent.randrange(len(ACTIONS)) for _ in range(args.envs)])
+        episodes += sum(dones)
+    elapsed = time.perf_counter() - start
+    print(f"{args.envs * args.steps / elapsed:.0f} pasos/s, {episodes} episodios terminados en {elapsed:.2f}s")
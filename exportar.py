@@ -0,0 +1,163 @@
+import argparse
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import pygame
+
+# Datos necesarios para dibujar la imagen de una solucion, copiados de la partida al encolarla.
+# Las imagenes solo muestran la esquina superior izquierda del mapa, asi que cells guarda solo las
+# grid_width x grid_height celdas que caben (ver crop_cells): CELL_WALL, CELL_FLOOR o 0 (nada).
+# labels son los textos "Pasos" de la imagen y del minimapa ya renderizados (ver label_pixels):
+# SDL_ttf no es seguro entre hilos, asi que el hilo del exportador nunca usa fuentes.
+SolutionJob = namedtuple('SolutionJob', [
+    'level', 'algorithm', 'grid_width', 'grid_height', 'block_size', 'cells', 'path',
+    'player', 'goal', 'steps', 'screen_size', 'labels',
+])
+
+CELL_WALL = 1
+CELL_FLOOR = 2
+
+
+def crop_size(screen_size, block_size, grid_width, grid_height):
+    # Celdas que caben en la imagen (y en el minimapa, que usa la misma escala sobre el lado mayor)
+    cells = -(-max(screen_size) // block_size)
+    return min(grid_width, cells), min(grid_height, cells)
+
+
+def label_pixels(surface):
+    # Texto renderizado en el hilo principal como datos RGBA que se pueden pasar a otro hilo
+    return surface.get_size(), pygame.image.tobytes(surface, 'RGBA')
+
+
+def label_surface(label):
+    size, data = label
+    return pygame.image.frombuffer(data, size, 'RGBA')
+
+
+def cell_colors(job, floor_gray):
+    # Un pixel RGB por celda: muros, suelo, camino con degradado, jugador y meta.
+    # Muros y suelo son grises: se traducen de una vez y se copian a los tres canales
+    width, height, block_size = job.grid_width, job.grid_height, job.block_size
+    table = bytearray(256)
+    table[CELL_WALL] = 0x64
+    table[CELL_FLOOR] = floor_gray
+    gray = job.cells.translate(table)
+    pixels = bytearray(3 * width * height)
+    pixels[0::3] = pixels[1::3] = pixels[2::3] = gray
+
+    # El degradado del camino sale de la misma funcion que usa el juego (importada aqui porque
+    # laberinto2 importa este modulo); solo se calcula para los pasos que caen en la imagen
+    from laberinto2 import Laberinto
+
+    total_steps = len(job.path)
+    for step, (x, y) in enumerate(job.path):
+        x, y = x // block_size, y // block_size
+        if x < width and y < height:
+            index = 3 * (y * width + x)
+            pixels[index:index + 3] = bytes(Laberinto.get_gradient_color(step, total_steps))
+
+    for (x, y), color in ((job.player, b'\x00\xff\x00'), (job.goal, b'\xff\x00\x00')):
+        x, y = x // block_size, y // block_size
+        if x < width and y < height:
+            index = 3 * (y * width + x)
+            pixels[index:index + 3] = color
+    return pixels
+
+
+def render_grid(job, pixels, cell_size, surface_size):
+    # La rejilla de colores se escribe de una vez como imagen (un pixel por celda) y se escala
+    surface = pygame.Surface(surface_size)
+    surface.fill((0, 0, 0))
+    grid = pygame.image.frombuffer(bytes(pixels), (job.grid_width, job.grid_height), 'RGB')
+    size = (max(1, int(job.grid_width * cell_size)), max(1, int(job.grid_height * cell_size)))
+    surface.blit(pygame.transform.scale(grid, size), (0, 0))
+    return surface
+
+
+class SolutionExporter:
+    # Exportador de imagenes de soluciones en un hilo aparte: dibujar y codificar los PNG no
+    # bloquea el bucle del juego. Se pueden encolar muchas soluciones seguidas (export_batch).
+    def __init__(self, minimap_size=400):
+        self.minimap_size = minimap_size
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.exported = 0
+        self.last_export_ms = 0.0
+
+    def submit(self, job):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.worker, daemon=True)
+            self.thread.start()
+        self.jobs.put(job)
+
+    def export_batch(self, jobs):
+        for job in jobs:
+            self.submit(job)
+
+    def wait(self):
+        # Esperar a que se hayan escrito todas las imagenes encoladas
+        self.jobs.join()
+
+    def pending(self):
+        return self.jobs.unfinished_tasks
+
+    def worker(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                start = time.perf_counter()
+                self.export(job)
+                self.last_export_ms = (time.perf_counter() - start) * 1000
+                self.exported += 1
+            except (pygame.error, OSError) as error:
+                print(f"No se pudo exportar la solucion del nivel {job.level} ({job.algorithm}): {error}")
+            finally:
+                self.jobs.task_done()
+
+    def export(self, job):
+        label, minimap_label = job.labels
+        algorithm_name = job.algorithm.replace('*', 'star')
+
+        maze_surface = render_grid(job, cell_colors(job, 0x32), job.block_size, job.screen_size)
+        maze_surface.blit(label_surface(label), (10, 10))
+        pygame.image.save(maze_surface, f"solucion_laberinto_nivel{job.level}_{algorithm_name}.png")
+
+        # El minimapa no dibuja el suelo
+        scale_factor = self.minimap_size / max(job.screen_size)
+        minimap_surface = render_grid(job, cell_colors(job, 0), job.block_size * scale_factor,
+                                      (self.minimap_size, self.minimap_size))
+        minimap_surface.blit(label_surface(minimap_label), (10, 10))
+        pygame.image.save(minimap_surface, f"minimapa_solucion_nivel{job.level}_{algorithm_name}.png")
+
+
+EXPORTER = SolutionExporter()
+
+
+if __name__ == "__main__":
+    from laberinto2 import Laberinto
+
+    parser = argparse.ArgumentParser(description="Exportar en lote las imagenes de las soluciones de un nivel")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--algorithms", nargs='+', default=['DFS', 'BFS', 'Greedy', 'A*', 'Dijkstra'])
+    args = parser.parse_args()
+
+    # Las partidas son headless: los textos se renderizan aqui, en el hilo principal
+    pygame.font.init()
+    fonts = (pygame.font.Font(None, 36), pygame.font.Font(None, 24))
+
+    start = time.perf_counter()
+    jobs = []
+    for algorithm in args.algorithms:
+        game = Laberinto(args.level, headless=True, seed=0)
+        game.ai_algorithm = algorithm
+        game.toggle_ai_solving()
+        if not (game.ai_solving and game.ai_path):
+            continue  # Sin solucion no se sobrescriben las imagenes anteriores
+        labels = tuple(label_pixels(font.render(f"Pasos: {game.solving_steps}", True, (255, 255, 255))) for font in fonts)
+        jobs.append(game.solution_job(labels))
+    EXPORTER.export_batch(jobs)
+    queued = time.perf_counter() - start
+    EXPORTER.wait()
+    print(f"{len(jobs)} soluciones encoladas en {queued * 1000:.1f} ms, exportadas en {time.perf_counter() - start:.2f}s")
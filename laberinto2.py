@@ -2,34 +2,138 @@ import pygame
 import sys
 import random
 import math
-from collections import deque
+from collections import deque, OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import heapq
+import time
+from array import array
+
+from particulas import ParticlePool
+from recursos import ASSETS
+from exportar import CELL_FLOOR, CELL_WALL, EXPORTER, SolutionJob, crop_size, label_pixels
+from caminos import RunPath
+from mundo import ChunkedMap
+
+# Duracion de un tick fijo de simulacion (60 ticks por segundo)
+TICK_MS = 1000 / 60
+
+# Rollouts por jugada de MCTS en las partidas grabadas: con un presupuesto de tiempo las jugadas
+# dependerian de la velocidad de la maquina y la repeticion no se podria verificar
+REPLAY_MCTS_ROLLOUTS = 200
+
+
+class RealTimeClock:
+    # Reloj de pared: indica cuantos ticks fijos corresponden al tiempo real transcurrido
+    def __init__(self, fps=60, max_catch_up=5):
+        self.clock = pygame.time.Clock()
+        self.fps = fps
+        self.max_catch_up = max_catch_up
+        self.last_time = None
+        self.accumulator = 0.0
+
+    def ticks_due(self):
+        current_time = pygame.time.get_ticks()
+        if self.last_time is None:
+            self.last_time = current_time - TICK_MS
+        self.accumulator += current_time - self.last_time
+        self.last_time = current_time
+        ticks = int(self.accumulator // TICK_MS)
+        self.accumulator -= ticks * TICK_MS
+        # Tras una pausa larga (pantallas de mensaje) no se intenta recuperar todo el tiempo perdido
+        return min(ticks, self.max_catch_up)
+
+    def wait(self):
+        self.clock.tick(self.fps)
+
+    def get_fps(self):
+        return self.clock.get_fps()
+
+
+class FastClock:
+    # Reloj sin espera: un tick por iteracion, tan rapido como permita la CPU
+    def ticks_due(self):
+        return 1
+
+    def wait(self):
+        pass
+
+    def get_fps(self):
+        return 0.0
+
+
+# Estado compacto e inmutable de una partida (sin graficos): posiciones como tuplas (x, y) en pixeles.
+# Se usa para reiniciar niveles al instante y para clonar partidas en simulaciones.
+GameState = namedtuple('GameState', [
+    'tick', 'player', 'enemies', 'collectibles', 'power_ups', 'paths',
+    'score', 'lives', 'time_limit', 'start_time', 'last_move_time', 'last_enemy_move_time',
+    'move_delay', 'invincible', 'power_up_timers', 'running', 'outcome', 'rng_state',
+])
+
+PrefetchedLevel = namedtuple('PrefetchedLevel', ['level', 'future'])
+
+# Atributos que solo dependen del mapa cargado: load_map y los indices construidos a partir de el
+MAP_FIELDS = ('maze', 'enemies', 'player', 'goal', 'paths', 'free_cells', 'free_slots', 'collectibles', 'power_ups',
+              'grid_width', 'grid_height', 'walls', 'costs', 'weighted_cells', 'enemy_cells', 'components',
+              'component_sizes', 'move_table', 'danger', 'danger_source', 'danger_removed', 'danger_added',
+              'danger_dirty', 'minimap_walls')
+
+# Un unico hilo para preparar el siguiente nivel mientras se juega el actual
+PREFETCHER = ThreadPoolExecutor(max_workers=1)
+
+
+def prefetch_level(level):
+    # Cargar un nivel como partida headless y construir de antemano sus indices
+    game = Laberinto(level, headless=True)
+    game.cell_moves()
+    game.update_danger_field()
+    return game
+
 
 class Laberinto:
-    def __init__(self, level):
-        pygame.init()
+    def __init__(self, level, headless=False, clock=None, seed=None):
+        self.created_at = time.perf_counter()
+        self.startup_ms = None  # Tiempo hasta el primer frame (pantalla de instrucciones)
         self.level = level
-        self.screen = pygame.display.set_mode((1280, 720))
-        pygame.display.set_caption(f"Laberinto - Nivel {level}")
-        self.clock = pygame.time.Clock()
+        # En modo headless no hay ventana, sonido ni graficos: solo la logica del juego
+        self.headless = headless
+        self.clock = clock or (FastClock() if headless else RealTimeClock())
+        # Generador aleatorio propio de la logica del juego, para partidas reproducibles
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.tick = 0
         self.running = True
+        self.outcome = None  # 'win' o 'lose' cuando termina el nivel en modo headless
         self.time_limit = 120
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = self.now()
 
         self.block_size = 40
-        self.load_assets()
-        
-        self.last_move_time = pygame.time.get_ticks()
+
+        self.last_move_time = self.now()
         self.move_delay = 150
+        self.last_enemy_move_time = self.now()
+        self.enemy_move_delay = 500
+        self.power_up_timers = {}  # Tipo de power-up -> instante (ms simulados) en que expira
 
         # Variables para la IA y la resolucion del laberinto
         self.ai_solving = False
-        self.ai_path = []
+        self.ai_path = RunPath()
         self.ai_algorithm = None
         self.solving_steps = 0
-
-        self.font = pygame.font.Font(None, 36)
-        self.small_font = pygame.font.Font(None, 24)
+        self.mcts = None  # Agente MCTS del mapa actual, creado al activar la IA con ese algoritmo
+        self.mcts_rollouts = None  # Si se indica, MCTS hace este numero fijo de rollouts por jugada
+        self.spacetime_horizon = 8  # Pasos del jugador cubiertos por la tabla de reservas de enemigos
+        self.spacetime_max_expansions = 20000
+        # Campo de peligro: distancia (en celdas) de cada celda al enemigo mas cercano
+        self.safety_margin = 0  # Los solvers evitan celdas a esta distancia o menos de un enemigo
+        self.risk_weight = 0  # Coste extra de A* por pasar cerca de enemigos (0 = desactivado)
+        self.danger_radius = 32  # Mas alla de esta distancia el campo guarda 255 ("lejos")
+        self.danger = bytearray()
+        self.danger_source = None  # Celda del enemigo mas cercano a cada celda (None = recalcular todo)
+        self.danger_removed = set()  # Celdas que han dejado los enemigos desde el ultimo calculo
+        self.danger_added = set()  # Celdas que han ocupado
+        self.danger_dirty = True
+        self.danger_updates = 0
+        self.replans = 0
 
         self.score = 0
         self.lives = 3
@@ -38,33 +142,130 @@ class Laberinto:
         self.maze = []
         self.enemies = []
         self.original_enemies = []
-        self.paths = []
-        self.collectibles = []
-        self.particles = []
-        self.power_ups = []
+        self.enemy_cells = {}  # Hash espacial: esquina superior izquierda de la celda -> indice del enemigo
+        self.paths = set()  # Celdas de suelo (esquina superior izquierda), sin duplicados
+        self.free_cells = []  # Celdas de suelo sin enemigo, para elegir una al azar en O(1)
+        self.free_slots = {}  # Celda -> posicion en free_cells
+        self.collectibles = {}  # Celda -> rect de la moneda
+        self.particles = ParticlePool()
+        self.power_ups = {}  # Celda -> rect del power-up
         self.floating_texts = []
 
-        self.load_map(f"maps/level{level}.txt")
+        self.load_map(self.map_path())
+
+        self.invincible = False
+        self.initial_state = self.snapshot()
+        self.prefetched_level = None  # Future con el siguiente nivel ya cargado
+        self.recorder = None  # Grabador de la repeticion del nivel (ver start_recording)
+        self.level_load_ms = 0.0
+
+        if headless:
+            self.collect_sound = None
+            self.lose_life_sound = None
+        else:
+            self.init_display()
+
+    def init_display(self):
+        # Ventana, graficos, fuentes y sonidos (no se usan en modo headless).
+        # Solo se inicializa lo necesario para el primer frame: las imagenes se cargan con
+        # ensure_assets() y el sonido en un hilo aparte.
+        pygame.display.init()
+        pygame.font.init()
+        self.screen = pygame.display.set_mode((1280, 720))
+        pygame.display.set_caption(f"Laberinto - Nivel {self.level}")
+        self.images = None
+
+        self.font = pygame.font.Font(None, 36)
+        self.small_font = pygame.font.Font(None, 24)
+
+        # Cache LRU de superficies de texto, con clave (fuente, texto, color)
+        self.text_cache = OrderedDict()
+        self.text_cache_size = 256
+        self.text_cache_hits = 0
+        self.text_cache_misses = 0
+        # Las etiquetas fijas de la interfaz se renderizan una sola vez y nunca se expulsan
+        self.static_texts = {(self.font, text, (255, 255, 255)): self.font.render(text, True, (255, 255, 255))
+                             for text in ['DFS', 'BFS', 'Greedy', 'A*', 'MCTS', 'ST-A*', 'Monedas', 'Dijkstra',
+                                          'IA: ON', 'IA: OFF']}
+        self.static_texts.update({(self.font, text, (255, 255, 0)): self.font.render(text, True, (255, 255, 0))
+                                  for text in ['Invincible', 'Speed']})
+
+        # Perfilador en pantalla (F3)
+        self.show_profiler = False
+
+        # Camara: zona del mapa (en pixeles) que se ve en pantalla
+        self.camera = pygame.Rect(0, 0, 0, 0)
+        self.visible_cell_count = 0
 
         self.background = self.create_background()
         
-        # Carga de sonidos
-        pygame.mixer.music.load("assets/audio.mp3")
-        pygame.mixer.music.play(-1)
-        
-        self.collect_sound = pygame.mixer.Sound("assets/coin.mp3")
-        self.lose_life_sound = pygame.mixer.Sound("assets/death.mp3")
-
-        self.invincible = False
+        # Sonidos por nombre de archivo; el mezclador se inicia y los decodifica en segundo plano
+        self.collect_sound = "coin.mp3"
+        self.lose_life_sound = "death.mp3"
+        ASSETS.load_audio_async("audio.mp3", [self.collect_sound, self.lose_life_sound])
+        self.prefetch_next_level()
+
+    def now(self):
+        # Tiempo simulado en milisegundos, derivado del contador de ticks
+        return self.tick * TICK_MS
+
+    def interval_ms(self, delay):
+        # Tiempo simulado entre dos acciones que exigen que pasen mas de delay ms (redondeado a ticks)
+        return (int(delay // TICK_MS) + 1) * TICK_MS
+
+    def first_tick(self, due, estimate):
+        # Primer tick futuro cuyo now() cumple due, partiendo de una estimacion y con la misma comparacion que update
+        tick = max(self.tick + 1, estimate)
+        while tick > self.tick + 1 and due((tick - 1) * TICK_MS):
+            tick -= 1
+        while not due(tick * TICK_MS):
+            tick += 1
+        return tick
+
+    def next_event_tick(self, move=(0, 0)):
+        # Primer tick en el que step(move) puede cambiar algo mas que el contador y los textos flotantes
+        if self.player.colliderect(self.goal) or (not self.invincible and self.player.topleft in self.enemy_cells):
+            return self.tick + 1
+        since, delay = self.last_enemy_move_time, self.enemy_move_delay
+        ticks = [self.first_tick(lambda now: now - since > delay, int((since + delay) // TICK_MS))]
+        start, limit = self.start_time, self.time_limit
+        ticks.append(self.first_tick(lambda now: (now - start) / 1000 > limit, int((start + limit * 1000) // TICK_MS)))
+        if move != (0, 0) or (self.ai_solving and (self.ai_algorithm == 'MCTS' or self.ai_path)):
+            last, move_delay = self.last_move_time, self.move_delay
+            ticks.append(self.first_tick(lambda now: now - last > move_delay, int((last + move_delay) // TICK_MS)))
+        for expiry in self.power_up_timers.values():
+            ticks.append(self.first_tick(lambda now: now >= expiry, int(expiry // TICK_MS)))
+        return min(ticks)
+
+    def skip_ticks(self, ticks):
+        # Avanzar ticks en los que no hay nada pendiente (ver next_event_tick) sin llamar a update.
+        # No pasa por el grabador: solo para reproducir partidas ya grabadas
+        self.tick += ticks
+        self.update_floating_texts(ticks)
+
+    def play_sound(self, sound):
+        # Mientras el hilo de audio no haya cargado el sonido, simplemente no suena
+        sound = ASSETS.sounds.get(sound)
+        if sound is not None:
+            sound.play()
+
+    def ensure_assets(self):
+        if self.images is None:
+            self.load_assets()
 
     def load_assets(self):
-        # Carga de imagenes y creacion de animaciones
-        self.images = {name: pygame.transform.scale(pygame.image.load(f"assets/{name}.png"), (self.block_size, self.block_size))
-                       for name in ['wall', 'enemy', 'goal', 'path', 'coin', 'power_up']}
-        self.player_frames = [pygame.transform.scale(pygame.image.load(f"assets/player_{i}.png"), (self.block_size, self.block_size))
-                              for i in range(4)]
+        # Imagenes y animaciones desde el atlas compartido (se carga una vez por proceso y tamano de celda)
+        sprites = ASSETS.sprites(self.block_size)
+        self.images = {name: sprites[name] for name in ['wall', 'enemy', 'goal', 'path', 'coin', 'power_up']}
+        self.player_frames = [sprites[f"player_{i}"] for i in range(4)]
         self.current_frame = 0
         self.animation_timer = 0
+        # Sombreado de las casillas lentas, mas oscuro cuanto mayor es el coste
+        self.cost_overlays = {}
+        for cost in range(2, 10):
+            overlay = pygame.Surface((self.block_size, self.block_size), pygame.SRCALPHA)
+            overlay.fill((60, 30, 0, 20 * cost))
+            self.cost_overlays[cost] = overlay
 
     def create_background(self):
         # Creacion de un fondo con estrellas
@@ -75,48 +276,88 @@ class Laberinto:
             pygame.draw.circle(background, color, (x, y), random.randint(1, 3))
         return background
 
+    def map_path(self):
+        return f"maps/level{self.level}.txt"
+
     def load_map(self, filepath):
         # Carga del mapa desde un archivo
+        with open(filepath, 'r') as file:
+            self.parse_map([line.strip() for line in file])
+
+    def parse_map(self, lines):
+        # Construir el mapa y sus indices a partir de sus lineas (p. ej. un mapa recibido por red)
         self.maze = []
         self.enemies = []
         self.player = None
         self.goal = None
-        self.paths = []
-
-        with open(filepath, 'r') as file:
-            for y, line in enumerate(file):
-                for x, char in enumerate(line.strip()):
-                    rect = pygame.Rect(x * self.block_size, y * self.block_size, self.block_size, self.block_size)
-                    if char == '#':
-                        self.maze.append(rect)
-                    elif char == 'M':
-                        self.enemies.append(rect)
-                    elif char == 'P':
-                        self.player = rect
-                    elif char == 'E':
-                        self.goal = rect
-                    elif char == '.':
-                        self.paths.append(rect)
-                    elif char == 'C':
-                        self.collectibles.append(rect)
-                    elif char == 'U':
-                        self.power_ups.append(rect)
-
-        self.paths.extend([self.player.copy()] + [enemy.copy() for enemy in self.enemies])
+        self.paths = set()
+        self.collectibles = {}
+        self.power_ups = {}
+
+        # Rejilla de ocupacion: un byte por celda (1 = muro)
+        self.grid_width = max((len(line) for line in lines), default=0)
+        self.grid_height = len(lines)
+        self.walls = bytearray(self.grid_width * self.grid_height)
+        # Coste de entrar en cada celda: '.' vale 1 y los digitos '2'-'9' son casillas lentas
+        self.costs = bytearray(b'\x01') * (self.grid_width * self.grid_height)
+        self.weighted_cells = {}  # Celda -> coste, solo para las casillas con coste mayor que 1
+
+        for y, line in enumerate(lines):
+            for x, char in enumerate(line):
+                rect = pygame.Rect(x * self.block_size, y * self.block_size, self.block_size, self.block_size)
+                if char == '#':
+                    self.maze.append(rect)
+                    self.walls[y * self.grid_width + x] = 1
+                elif char == 'M':
+                    self.enemies.append(rect)
+                elif char == 'P':
+                    self.player = rect
+                elif char == 'E':
+                    self.goal = rect
+                elif char == '.':
+                    self.paths.add(rect.topleft)
+                elif char.isdigit() and char != '0':
+                    self.paths.add(rect.topleft)
+                    self.costs[y * self.grid_width + x] = int(char)
+                    if char != '1':
+                        self.weighted_cells[rect.topleft] = int(char)
+                elif char == 'C':
+                    self.collectibles[rect.topleft] = rect
+                elif char == 'U':
+                    self.power_ups[rect.topleft] = rect
+
+        self.paths.add(self.player.topleft)
+        self.paths.update(enemy.topleft for enemy in self.enemies)
+        self.index_enemies()
+        self.rebuild_free_cells()
+        self.minimap_walls = None  # La capa de muros del minimapa se regenera con el nuevo mapa
+        self.move_table = None  # Tabla de movimientos por celda, se construye al pedirla
+        self.compute_components()
 
     def run(self):
         # Bucle principal del juego
         self.show_instructions()
-        last_enemy_move_time = pygame.time.get_ticks()
         while self.running:
             self.handle_events()
-            self.update()
-            current_time = pygame.time.get_ticks()
-            if current_time - last_enemy_move_time > 500:
-                self.move_enemies()
-                last_enemy_move_time = current_time
+            keys = pygame.key.get_pressed()
+            move = (keys[pygame.K_RIGHT] - keys[pygame.K_LEFT], keys[pygame.K_DOWN] - keys[pygame.K_UP])
+            # Paso fijo: se simulan tantos ticks como indique el reloj, independientemente del dibujado
+            for _ in range(self.clock.ticks_due()):
+                self.step(move)
+                if not self.running:
+                    break
             self.draw()
-            self.clock.tick(60)
+            self.clock.wait()
+
+    def step(self, move=(0, 0)):
+        # Avanzar la simulacion un tick fijo; move es la direccion (dx, dy) pedida por el jugador
+        if self.recorder is not None:
+            self.recorder.record_tick(move)
+        self.tick += 1
+        self.update(move)
+        if self.running and self.now() - self.last_enemy_move_time > self.enemy_move_delay:
+            self.move_enemies()
+            self.last_enemy_move_time = self.now()
 
     def handle_events(self):
         for event in pygame.event.get():
@@ -127,30 +368,301 @@ class Laberinto:
                     self.running = False
                 elif event.key == pygame.K_r:
                     self.reset_level()
+                elif event.key == pygame.K_F3:
+                    self.show_profiler = not self.show_profiler
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if self.ai_button_rect.collidepoint(event.pos):
                     self.toggle_ai_solving()
                 elif self.dfs_button_rect.collidepoint(event.pos):
-                    self.ai_algorithm = 'DFS'
+                    self.select_algorithm('DFS')
                 elif self.bfs_button_rect.collidepoint(event.pos):
-                    self.ai_algorithm = 'BFS'
+                    self.select_algorithm('BFS')
                 elif self.greedy_button_rect.collidepoint(event.pos):
-                    self.ai_algorithm = 'Greedy'
+                    self.select_algorithm('Greedy')
                 elif self.astar_button_rect.collidepoint(event.pos):
-                    self.ai_algorithm = 'A*'
-            if event.type == pygame.USEREVENT:
-                self.move_delay = 150  # Reset speed
-            elif event.type == pygame.USEREVENT + 1:
-                self.invincible = False
+                    self.select_algorithm('A*')
+                elif self.mcts_button_rect.collidepoint(event.pos):
+                    self.select_algorithm('MCTS')
+                elif self.spacetime_button_rect.collidepoint(event.pos):
+                    self.select_algorithm('ST-A*')
+                elif self.route_button_rect.collidepoint(event.pos):
+                    self.select_algorithm('Monedas')
+                elif self.dijkstra_button_rect.collidepoint(event.pos):
+                    self.select_algorithm('Dijkstra')
 
     def remove_enemies(self):
         # Eliminar enemigos temporalmente
         self.original_enemies = self.enemies.copy()
         self.enemies.clear()
+        self.index_enemies()
+        self.rebuild_free_cells()
 
     def restore_enemies(self):
         # Restaurar enemigos
         self.enemies = self.original_enemies.copy()
+        self.index_enemies()
+        self.rebuild_free_cells()
+
+    def index_enemies(self):
+        # Reconstruir el hash espacial de enemigos por celda
+        self.enemy_cells = {enemy.topleft: i for i, enemy in enumerate(self.enemies)}
+        self.danger_source = None
+        self.danger_dirty = True
+        self.minimap_enemies_dirty = True
+
+    def rebuild_free_cells(self):
+        # Reconstruir el indice de celdas libres (suelo sin enemigo) desde paths
+        self.free_cells = [pos for pos in self.paths if pos not in self.enemy_cells]
+        self.free_slots = {pos: i for i, pos in enumerate(self.free_cells)}
+
+    def add_free_cell(self, pos):
+        if pos not in self.free_slots and pos not in self.enemy_cells:
+            self.free_slots[pos] = len(self.free_cells)
+            self.free_cells.append(pos)
+
+    def remove_free_cell(self, pos):
+        # Quitar una celda del indice intercambiandola con la ultima
+        slot = self.free_slots.pop(pos, None)
+        if slot is None:
+            return
+        last = self.free_cells.pop()
+        if slot < len(self.free_cells):
+            self.free_cells[slot] = last
+            self.free_slots[last] = slot
+
+    def update_danger_field(self):
+        # Tras mover enemigos basta con reparar el campo; al cambiar de mapa o de muros se recalcula
+        if self.danger_source is not None and len(self.danger) == len(self.walls):
+            self.repair_danger_field()
+        else:
+            self.compute_danger_field()
+        self.danger_removed.clear()
+        self.danger_added.clear()
+        self.danger_dirty = False
+        self.danger_updates += 1
+
+    def compute_danger_field(self):
+        # BFS multi-origen desde todos los enemigos sobre los muros estaticos, limitado a danger_radius
+        width = self.grid_width
+        walls = self.walls
+        danger = bytearray(b'\xff') * len(walls)
+        source = array('i', [-1]) * len(walls)
+        frontier = []
+        for x, y in self.enemy_cells:
+            index = (y // self.block_size) * width + x // self.block_size
+            danger[index] = 0
+            source[index] = index
+            frontier.append(index)
+
+        distance = 0
+        while frontier and distance < self.danger_radius:
+            distance += 1
+            next_frontier = []
+            for index in frontier:
+                x = index % width
+                for neighbor in (index - width, index + width,
+                                 index - 1 if x > 0 else -1, index + 1 if x < width - 1 else -1):
+                    if 0 <= neighbor < len(danger) and danger[neighbor] == 255 and not walls[neighbor]:
+                        danger[neighbor] = distance
+                        source[neighbor] = source[index]
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        self.danger = danger
+        self.danger_source = source
+
+    def repair_danger_field(self):
+        # Reparar el campo solo alrededor de los enemigos que se han movido:
+        #   1. Expandir desde las celdas ocupadas: las que quedan mas cerca de ellas se actualizan ya
+        #   2. Borrar las celdas que siguen apuntando a una celda que ha quedado libre
+        #   3. Volver a expandir la zona borrada desde su borde
+        width, danger, source = self.grid_width, self.danger, self.danger_source
+        size = len(danger)
+        radius = self.danger_radius
+        buckets = [[] for _ in range(radius)]
+        for index in self.danger_added:
+            danger[index] = 0
+            source[index] = index
+            buckets[0].append(index)
+        self.expand_danger_field(buckets)
+
+        for start in self.danger_removed:
+            danger[start] = 255
+            source[start] = -1
+            stack = [start]
+            while stack:
+                index = stack.pop()
+                x = index % width
+                for neighbor in (index - width, index + width,
+                                 index - 1 if x > 0 else -1, index + 1 if x < width - 1 else -1):
+                    if 0 <= neighbor < size:
+                        if source[neighbor] == start:
+                            danger[neighbor] = 255
+                            source[neighbor] = -1
+                            stack.append(neighbor)
+                        elif danger[neighbor] < radius:
+                            buckets[danger[neighbor]].append(neighbor)  # Borde de la zona borrada
+        self.expand_danger_field(buckets)
+
+    def expand_danger_field(self, buckets):
+        # Expansion por distancias crecientes desde las celdas de cada cubeta, solo donde mejora el campo
+        width, walls, danger, source = self.grid_width, self.walls, self.danger, self.danger_source
+        size = len(danger)
+        radius = len(buckets)
+        for distance in range(radius):
+            bucket, buckets[distance] = buckets[distance], []
+            for index in bucket:
+                if danger[index] != distance:
+                    continue  # Celda borrada despues de anotarla o ya mejorada desde otra
+                x = index % width
+                for neighbor in (index - width, index + width,
+                                 index - 1 if x > 0 else -1, index + 1 if x < width - 1 else -1):
+                    if 0 <= neighbor < size and distance + 1 < danger[neighbor] and not walls[neighbor]:
+                        danger[neighbor] = distance + 1
+                        source[neighbor] = source[index]
+                        if distance + 1 < radius:
+                            buckets[distance + 1].append(neighbor)
+
+    def move_danger_sources(self, left, entered):
+        # Anotar las celdas que dejan y ocupan los enemigos (un enemigo que entra donde otro sale se anula)
+        for x, y in left:
+            index = (y // self.block_size) * self.grid_width + x // self.block_size
+            if index in self.danger_added:
+                self.danger_added.discard(index)
+            else:
+                self.danger_removed.add(index)
+        for x, y in entered:
+            index = (y // self.block_size) * self.grid_width + x // self.block_size
+            if index in self.danger_removed:
+                self.danger_removed.discard(index)
+            else:
+                self.danger_added.add(index)
+
+    def danger_at(self, pos):
+        # Distancia al enemigo mas cercano; el campo solo se recalcula si los enemigos han cambiado
+        if self.danger_dirty:
+            self.update_danger_field()
+        x, y = pos[0] // self.block_size, pos[1] // self.block_size
+        if not (0 <= x < self.grid_width and 0 <= y < self.grid_height):
+            return 255
+        return self.danger[y * self.grid_width + x]
+
+    def is_wall(self, pos):
+        # Consultar la rejilla de ocupacion; fuera del mapa se considera muro
+        x, y = pos[0] // self.block_size, pos[1] // self.block_size
+        if not (0 <= x < self.grid_width and 0 <= y < self.grid_height):
+            return True
+        return self.walls[y * self.grid_width + x] == 1
+
+    def cell_moves(self):
+        # Tabla de movimientos por indice de celda (y * ancho + x): celda destino en cada una de
+        # las 4 direcciones, o la propia celda si hay muro. Se construye una vez por mapa.
+        if self.move_table is None:
+            width = self.grid_width
+            self.move_table = []
+            for index in range(width * self.grid_height):
+                x, y = index % width, index // width
+                self.move_table.append(tuple(
+                    index + dx + dy * width
+                    if not self.is_wall(((x + dx) * self.block_size, (y + dy) * self.block_size)) else index
+                    for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]))
+        return self.move_table
+
+    def grid_neighbors(self, index):
+        # Celdas libres vecinas de una celda, consultando directamente la rejilla de muros
+        width = self.grid_width
+        x = index % width
+        neighbors = []
+        for neighbor in (index - width, index + width, index - 1 if x > 0 else -1, index + 1 if x < width - 1 else -1):
+            if 0 <= neighbor < len(self.walls) and not self.walls[neighbor]:
+                neighbors.append(neighbor)
+        return neighbors
+
+    def flood_component(self, start, label):
+        # Etiquetar con label toda la zona conexa de start; devuelve el numero de celdas
+        components = self.components
+        components[start] = label
+        queue = deque([start])
+        count = 0
+        while queue:
+            current = queue.popleft()
+            count += 1
+            for neighbor in self.grid_neighbors(current):
+                if components[neighbor] != label:
+                    components[neighbor] = label
+                    queue.append(neighbor)
+        return count
+
+    def compute_components(self):
+        # Componentes conexas de las celdas libres sobre los muros estaticos (-1 = muro).
+        # Permiten descartar en O(1) las metas inalcanzables antes de lanzar un solver.
+        self.components = [-1] * len(self.walls)
+        self.component_sizes = []
+        for index in range(len(self.walls)):
+            if not self.walls[index] and self.components[index] < 0:
+                self.component_sizes.append(self.flood_component(index, len(self.component_sizes)))
+
+    def is_reachable(self, a, b):
+        # Dos posiciones (en pixeles) estan conectadas si pertenecen a la misma zona
+        width, block_size = self.grid_width, self.block_size
+        component = self.components[(a[1] // block_size) * width + a[0] // block_size]
+        return component >= 0 and component == self.components[(b[1] // block_size) * width + b[0] // block_size]
+
+    def set_wall(self, pos, wall):
+        # Abrir o cerrar una celda durante la partida, actualizando conectividad y caches
+        x, y = pos[0] // self.block_size, pos[1] // self.block_size
+        index = y * self.grid_width + x
+        if self.walls[index] == int(wall):
+            return
+        self.walls[index] = int(wall)
+        rect = pygame.Rect(x * self.block_size, y * self.block_size, self.block_size, self.block_size)
+        neighbors = self.grid_neighbors(index)
+
+        if wall:
+            self.maze.append(rect)
+            self.paths.discard(rect.topleft)
+            self.remove_free_cell(rect.topleft)
+            # Cerrar una celda puede partir su zona: se reetiqueta cada trozo por separado
+            old_label = self.components[index]
+            self.components[index] = -1
+            self.component_sizes[old_label] = 0
+            for neighbor in neighbors:
+                if self.components[neighbor] == old_label:
+                    label = len(self.component_sizes)
+                    self.component_sizes.append(self.flood_component(neighbor, label))
+        else:
+            self.maze.remove(rect)
+            self.paths.add(rect.topleft)
+            self.add_free_cell(rect.topleft)
+            # Abrir una celda une las zonas vecinas: las pequenas se reetiquetan con la mayor
+            labels = {self.components[neighbor] for neighbor in neighbors}
+            if labels:
+                largest = max(labels, key=lambda label: self.component_sizes[label])
+                self.components[index] = largest
+                self.component_sizes[largest] += 1
+                for neighbor in neighbors:
+                    label = self.components[neighbor]
+                    if label != largest:
+                        self.component_sizes[largest] += self.component_sizes[label]
+                        self.component_sizes[label] = 0
+                        self.flood_component(neighbor, largest)
+            else:
+                self.components[index] = len(self.component_sizes)
+                self.component_sizes.append(1)
+
+        # Caches que dependen de los muros
+        self.minimap_walls = None
+        self.move_table = None
+        self.danger_source = None
+        self.danger_dirty = True
+
+    def cell_cost(self, pos):
+        # Coste de terreno de una celda (1 = suelo normal)
+        return self.costs[(pos[1] // self.block_size) * self.grid_width + pos[0] // self.block_size]
+
+    def terrain_delay(self):
+        # Espera extra para salir de una casilla lenta: coste - 1 movimientos adicionales
+        return (self.cell_cost(self.player.topleft) - 1) * self.move_delay
 
     def move_player_to(self, position):
         # Mover al jugador a una posicion especifica
@@ -162,62 +674,77 @@ class Laberinto:
     def move_player(self, move_x, move_y):
         # Mover al jugador
         new_position = self.player.move(move_x, move_y)
-        if not any(new_position.colliderect(wall) for wall in self.maze):
+        if not self.is_wall(new_position.topleft):
             self.move_player_to(new_position.topleft)
 
-    def is_safe(self, pos):
-        # Verificar si una posicion es segura
-        return not any(enemy.collidepoint(pos) for enemy in self.enemies)
+    def is_safe(self, pos, margin=0):
+        # Verificar si una posicion es segura: ningun enemigo a margin celdas o menos
+        return self.danger_at(pos) > margin
     
+    def trace_path(self, came_from, goal):
+        # Reconstruir el camino hasta goal siguiendo los padres, como RunPath
+        path = []
+        while goal is not None:
+            path.append(goal)
+            goal = came_from[goal]
+        return RunPath.from_positions(reversed(path))
+
     def solve_maze_dfs(self):
         # Resolver el laberinto usando DFS (Depth-First Search)
         start = self.player.topleft
         goal = self.goal.topleft
-        stack = [(start, [start])]
-        visited = set()
+        if not self.is_reachable(start, goal):
+            return RunPath()  # La meta esta en otra zona conexa: no hace falta explorar
+        # Cada entrada guarda de donde viene en lugar de una copia del camino
+        stack = [(start, None)]
+        came_from = {}
 
         while stack:
-            (current, path) = stack.pop()
-            if current not in visited:
-                visited.add(current)
+            (current, parent) = stack.pop()
+            if current not in came_from:
+                came_from[current] = parent
 
                 if current == goal:
-                    return path
+                    return self.trace_path(came_from, goal)
 
                 for dx, dy in [(0, self.block_size), (self.block_size, 0), (0, -self.block_size), (-self.block_size, 0)]:
                     neighbor = (current[0] + dx, current[1] + dy)
-                    if (not any(wall.collidepoint(neighbor) for wall in self.maze) and
-                        self.is_safe(neighbor) and neighbor not in visited):
-                        stack.append((neighbor, path + [neighbor]))
+                    if (not self.is_wall(neighbor) and
+                        self.is_safe(neighbor, self.safety_margin) and neighbor not in came_from):
+                        stack.append((neighbor, current))
 
-        return []  # No se encontro camino
+        return RunPath()  # No se encontro camino
     
     def solve_maze_bfs(self):
         # Resolver el laberinto usando BFS (Breadth-First Search)
         start = self.player.topleft
         goal = self.goal.topleft
-        queue = deque([(start, [start])])
-        visited = set()
+        if not self.is_reachable(start, goal):
+            return RunPath()  # La meta esta en otra zona conexa: no hace falta explorar
+        queue = deque([(start, None)])
+        came_from = {}
 
         while queue:
-            (current, path) = queue.popleft()
-            if current not in visited:
-                visited.add(current)
+            (current, parent) = queue.popleft()
+            if current not in came_from:
+                came_from[current] = parent
 
                 if current == goal:
-                    return path
+                    return self.trace_path(came_from, goal)
 
                 for dx, dy in [(0, self.block_size), (self.block_size, 0), (0, -self.block_size), (-self.block_size, 0)]:
                     neighbor = (current[0] + dx, current[1] + dy)
-                    if (not any(wall.collidepoint(neighbor) for wall in self.maze) and
-                        self.is_safe(neighbor) and neighbor not in visited):
-                        queue.append((neighbor, path + [neighbor]))
+                    if (not self.is_wall(neighbor) and
+                        self.is_safe(neighbor, self.safety_margin) and neighbor not in came_from):
+                        queue.append((neighbor, current))
 
-        return []  # No se encontro camino
+        return RunPath()  # No se encontro camino
 
     def solve_maze_greedy(self):
         start = self.player.topleft
         goal = self.goal.topleft
+        if not self.is_reachable(start, goal):
+            return RunPath()  # La meta esta en otra zona conexa: no hace falta explorar
         
         def heuristic(a, b):
             return math.sqrt((b[0] - a[0]) ** 2 + (b[1] - a[1]) ** 2)
@@ -234,7 +761,7 @@ class Laberinto:
                 while current:
                     path.append(current)
                     current = came_from[current]
-                return path[::-1]
+                return RunPath.from_positions(reversed(path))
             
             if current in visited:
                 continue
@@ -243,16 +770,18 @@ class Laberinto:
             
             for dx, dy in [(0, self.block_size), (self.block_size, 0), (0, -self.block_size), (-self.block_size, 0)]:
                 neighbor = (current[0] + dx, current[1] + dy)
-                if (not any(wall.collidepoint(neighbor) for wall in self.maze) and
-                    self.is_safe(neighbor) and neighbor not in visited):
+                if (not self.is_wall(neighbor) and
+                    self.is_safe(neighbor, self.safety_margin) and neighbor not in visited):
                     came_from[neighbor] = current
                     heapq.heappush(heap, (heuristic(neighbor, goal), neighbor))
         
-        return []  # No path found
+        return RunPath()  # No path found
 
     def solve_maze_astar(self):
         start = self.player.topleft
         goal = self.goal.topleft
+        if not self.is_reachable(start, goal):
+            return RunPath()  # La meta esta en otra zona conexa: no hace falta explorar
         
         def heuristic(a, b):
             return math.sqrt((b[0] - a[0]) ** 2 + (b[1] - a[1]) ** 2)
@@ -271,16 +800,16 @@ class Laberinto:
                     path.append(current)
                     current = came_from[current]
                 path.append(start)
-                return path[::-1]
+                return RunPath.from_positions(reversed(path))
             
             open_set.remove(current)
             
             for dx, dy in [(0, self.block_size), (self.block_size, 0), (0, -self.block_size), (-self.block_size, 0)]:
                 neighbor = (current[0] + dx, current[1] + dy)
-                if any(wall.collidepoint(neighbor) for wall in self.maze) or not self.is_safe(neighbor):
+                if self.is_wall(neighbor) or not self.is_safe(neighbor, self.safety_margin):
                     continue
                 
-                tentative_g_score = g_score[current] + self.block_size
+                tentative_g_score = g_score[current] + self.block_size * self.cell_cost(neighbor) + self.risk_cost(neighbor)
                 
                 if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
                     came_from[neighbor] = current
@@ -289,11 +818,158 @@ class Laberinto:
                     if neighbor not in open_set:
                         open_set.add(neighbor)
         
-        return []  # No path found
+        return RunPath()  # No path found
+
+    def solve_maze_spacetime(self):
+        # A* espacio-temporal: busca sobre estados (celda, paso) contra una tabla de reservas
+        # con las celdas que los enemigos podrian ocupar en cada paso del horizonte.
+        # Permite esperar en el sitio y limita el numero de estados expandidos.
+        start = self.player.topleft
+        goal = self.goal.topleft
+        if not self.is_reachable(start, goal):
+            return RunPath()  # La meta esta en otra zona conexa: no hace falta explorar
+        horizon = self.spacetime_horizon
+        directions = [(0, 0), (0, self.block_size), (self.block_size, 0), (0, -self.block_size), (-self.block_size, 0)]
+
+        # Enemigos que se mueven antes del paso s del jugador (en cada paso el jugador se mueve primero)
+        move_interval = self.interval_ms(self.move_delay)
+        enemy_interval = self.interval_ms(self.enemy_move_delay)
+        clock = self.now() - self.last_enemy_move_time
+
+        def enemy_moves(step):
+            return int((clock + step * move_interval) // enemy_interval)
+
+        # Tabla de reservas a partir del campo de peligro: una celda esta reservada
+        # tras k movimientos de enemigos si su distancia al enemigo mas cercano es <= k
+        def reserved(pos, step):
+            # Ocupar pos durante el paso step exige que ningun enemigo pueda llegar antes del paso siguiente
+            return step <= horizon and self.danger_at(pos) <= enemy_moves(step + 1)
+
+        def heuristic(pos):
+            return (abs(goal[0] - pos[0]) + abs(goal[1] - pos[1])) // self.block_size
+
+        # Pasado el horizonte el tiempo deja de importar: los estados se agrupan en horizon + 1
+        start_state = (start, 0)
+        came_from = {start_state: None}
+        g_score = {start_state: 0}
+        heap = [(heuristic(start), 0, start_state)]
+        expansions = 0
+
+        while heap and expansions < self.spacetime_max_expansions:
+            _, steps, state = heapq.heappop(heap)
+            if steps > g_score[state]:
+                continue
+            pos, step = state
+
+            if pos == goal:
+                path = []
+                while state:
+                    path.append(state[0])
+                    state = came_from[state]
+                return RunPath.from_positions(reversed(path))
+
+            expansions += 1
+            next_step = min(step + 1, horizon + 1)
+            for dx, dy in directions:
+                if (dx, dy) == (0, 0) and step > horizon:
+                    continue  # Esperar solo tiene sentido mientras hay reservas
+                neighbor = (pos[0] + dx, pos[1] + dy)
+                if self.is_wall(neighbor) or reserved(neighbor, step + 1):
+                    continue
+                neighbor_state = (neighbor, next_step)
+                tentative_g_score = steps + 1
+                if tentative_g_score < g_score.get(neighbor_state, math.inf):
+                    came_from[neighbor_state] = state
+                    g_score[neighbor_state] = tentative_g_score
+                    heapq.heappush(heap, (tentative_g_score + heuristic(neighbor), tentative_g_score, neighbor_state))
+
+        return RunPath()  # No se encontro camino dentro del limite de expansiones
+
+    def solve_maze_dijkstra(self):
+        # Dijkstra con cola de cubetas (algoritmo de Dial): como los costes de las casillas son
+        # enteros pequenos, cada distancia tiene su cubeta y no hace falta un monticulo
+        moves = self.cell_moves()
+        costs = self.costs
+        width = self.grid_width
+        start = (self.player.top // self.block_size) * width + self.player.left // self.block_size
+        goal = (self.goal.top // self.block_size) * width + self.goal.left // self.block_size
+        if self.components[start] != self.components[goal]:
+            return RunPath()  # La meta esta en otra zona conexa
+        if self.danger_dirty:
+            self.update_danger_field()
+        danger = self.danger
+        margin = self.safety_margin
+
+        # Basta con max_cost + 1 cubetas circulares: las distancias pendientes nunca se separan mas
+        bucket_count = max(costs) + 1
+        buckets = [[] for _ in range(bucket_count)]
+        distances = [math.inf] * len(moves)
+        parents = [-1] * len(moves)
+        distances[start] = 0
+        buckets[0].append(start)
+        pending = 1
+        distance = 0
+
+        while pending:
+            bucket = buckets[distance % bucket_count]
+            while bucket:
+                current = bucket.pop()
+                pending -= 1
+                if distances[current] != distance:
+                    continue  # Entrada obsoleta: la celda ya se alcanzo con menor coste
+
+                if current == goal:
+                    path = []
+                    while current != -1:
+                        path.append(((current % width) * self.block_size, (current // width) * self.block_size))
+                        current = parents[current]
+                    return RunPath.from_positions(reversed(path))
+
+                for neighbor in moves[current]:
+                    if neighbor == current or danger[neighbor] <= margin:
+                        continue
+                    new_distance = distance + costs[neighbor]
+                    if new_distance < distances[neighbor]:
+                        distances[neighbor] = new_distance
+                        parents[neighbor] = current
+                        buckets[new_distance % bucket_count].append(neighbor)
+                        pending += 1
+            distance += 1
+
+        return RunPath()  # No se encontro camino
+
+    def solve_maze_route(self):
+        # Ruta que recoge monedas y power-ups en el mejor orden posible antes de llegar a la meta
+        from rutas import RoutePlanner
+
+        if not self.is_reachable(self.player.topleft, self.goal.topleft):
+            return RunPath()
+        return RoutePlanner(self).plan()
+
+    def risk_cost(self, pos):
+        # Coste de riesgo de una celda para A*: crece al acercarse a los enemigos
+        if not self.risk_weight:
+            return 0
+        return self.risk_weight * self.block_size / max(1, self.danger_at(pos))
+
+    def select_algorithm(self, algorithm):
+        # Con la IA en marcha el algoritmo elegido decide los recalculos (o pasa a MCTS): se graba
+        if algorithm != self.ai_algorithm and self.recorder is not None:
+            self.recorder.record_select(algorithm)
+        self.ai_algorithm = algorithm
 
     def toggle_ai_solving(self):
+        self.switch_ai_solving()
+        if self.recorder is not None:
+            self.recorder.record_toggle(self.ai_algorithm, self.ai_path if self.ai_solving else RunPath())
+
+    def switch_ai_solving(self):
         self.ai_solving = not self.ai_solving
         if self.ai_solving and self.ai_algorithm:
+            if not self.is_reachable(self.player.topleft, self.goal.topleft):
+                print("La meta no es alcanzable desde la posicion del jugador.")
+                self.ai_solving = False
+                return
             if self.ai_algorithm == 'DFS':
                 self.ai_path = self.solve_maze_dfs()
             elif self.ai_algorithm == 'BFS':
@@ -302,110 +978,112 @@ class Laberinto:
                 self.ai_path = self.solve_maze_greedy()
             elif self.ai_algorithm == 'A*':
                 self.ai_path = self.solve_maze_astar()
+            elif self.ai_algorithm == 'ST-A*':
+                self.ai_path = self.solve_maze_spacetime()
+            elif self.ai_algorithm == 'Monedas':
+                self.ai_path = self.solve_maze_route()
+            elif self.ai_algorithm == 'Dijkstra':
+                self.ai_path = self.solve_maze_dijkstra()
+            elif self.ai_algorithm == 'MCTS':
+                # El agente MCTS decide cada jugada sobre la marcha: no hay ruta previa que guardar
+                self.create_mcts_planner()
+                self.solving_steps = 0
+                return
             
             self.solving_steps = len(self.ai_path) - 1
             if not self.ai_path:
                 print(f"No se encontró un camino seguro. La IA ({self.ai_algorithm}) no puede resolver el laberinto de forma segura.")
                 self.ai_solving = False
-            else:
+            elif not self.headless:
                 self.save_solution_image()
         else:
             self.restore_enemies()
 
-    def save_solution_image(self):
-        # Guardar imagen de la solucion
-        maze_surface = pygame.Surface((self.screen.get_width(), self.screen.get_height()))
-        maze_surface.fill((0, 0, 0))
-
-        for wall in self.maze:
-            pygame.draw.rect(maze_surface, (100, 100, 100), wall)
-        
-        for path in self.paths:
-            pygame.draw.rect(maze_surface, (50, 50, 50), path)
-
-        for i, pos in enumerate(self.ai_path):
-            color = self.get_gradient_color(i, len(self.ai_path))
-            pygame.draw.rect(maze_surface, color, (pos[0], pos[1], self.block_size, self.block_size))
-
-        pygame.draw.rect(maze_surface, (0, 255, 0), self.player)
-        pygame.draw.rect(maze_surface, (255, 0, 0), self.goal)
-
-        steps_text = self.font.render(f"Pasos: {self.solving_steps}", True, (255, 255, 255))
-        maze_surface.blit(steps_text, (10, 10))
+    def create_mcts_planner(self):
+        from mcts import MCTSPlanner
 
-        # Use a valid filename
-        algorithm_name = self.ai_algorithm.replace('*', 'star')
-        filename = f"solucion_laberinto_nivel{self.level}_{algorithm_name}.png"
-        pygame.image.save(maze_surface, filename)
-
-        # Crear y guardar el minimapa
-        minimap_size = 400
-        minimap_surface = pygame.Surface((minimap_size, minimap_size))
-        minimap_surface.fill((0, 0, 0))
+        self.mcts = MCTSPlanner(self, seed=self.rng.random(), max_rollouts=self.mcts_rollouts)
+        return self.mcts
 
-        scale_factor = minimap_size / max(self.screen.get_width(), self.screen.get_height())
-
-        for wall in self.maze:
-            pygame.draw.rect(minimap_surface, (100, 100, 100), 
-                             (wall.x * scale_factor, wall.y * scale_factor, 
-                              wall.width * scale_factor, wall.height * scale_factor))
-
-        for i, pos in enumerate(self.ai_path):
-            color = self.get_gradient_color(i, len(self.ai_path))
-            pygame.draw.rect(minimap_surface, color, 
-                             (pos[0] * scale_factor, pos[1] * scale_factor, 
-                              self.block_size * scale_factor, self.block_size * scale_factor))
-
-        pygame.draw.rect(minimap_surface, (0, 255, 0), 
-                         (self.player.x * scale_factor, self.player.y * scale_factor, 
-                          self.player.width * scale_factor, self.player.height * scale_factor))
-
-        pygame.draw.rect(minimap_surface, (255, 0, 0), 
-                         (self.goal.x * scale_factor, self.goal.y * scale_factor, 
-                          self.goal.width * scale_factor, self.goal.height * scale_factor))
-
-        steps_text = self.small_font.render(f"Pasos: {self.solving_steps}", True, (255, 255, 255))
-        minimap_surface.blit(steps_text, (10, 10))
-
-        # Use a valid filename for the minimap
-        minimap_filename = f"minimapa_solucion_nivel{self.level}_{algorithm_name}.png"
-        pygame.image.save(minimap_surface, minimap_filename)
-
-    def get_gradient_color(self, step, total_steps):
+    def save_solution_image(self):
+        # Guardar imagen de la solucion: se encola y la dibuja y escribe el hilo del exportador
+        EXPORTER.submit(self.solution_job())
+
+    def solution_job(self, labels=None):
+        # Copia de los datos que necesita el exportador, para que el juego pueda seguir modificandolos.
+        # Los textos se renderizan aqui (hilo principal); sin ventana hay que pasarlos en labels
+        screen_size = self.screen.get_size() if not self.headless else (1280, 720)
+        if labels is None:
+            text = f"Pasos: {self.solving_steps}"
+            labels = (label_pixels(self.render_text(text)), label_pixels(self.render_text(text, font=self.small_font)))
+
+        # Solo se copian las celdas que caben en la imagen, no todo el mapa
+        width, height = crop_size(screen_size, self.block_size, self.grid_width, self.grid_height)
+        cells = bytearray(width * height)
+        for y in range(height):
+            for x in range(width):
+                if self.walls[y * self.grid_width + x]:
+                    cells[y * width + x] = CELL_WALL
+                elif (x * self.block_size, y * self.block_size) in self.paths:
+                    cells[y * width + x] = CELL_FLOOR
+        return SolutionJob(
+            self.level, self.ai_algorithm, width, height, self.block_size, bytes(cells), self.ai_path.copy(),
+            self.player.topleft, self.goal.topleft, self.solving_steps, screen_size, labels,
+        )
+
+    @staticmethod
+    def get_gradient_color(step, total_steps):
         # Obtener color gradiente para la visualizacion de la solucion
         r = int(255 * (total_steps - step) / total_steps)
         g = int(255 * step / total_steps)
         b = 0
         return (r, g, b)
 
-    def update(self):
+    def update(self, move=(0, 0)):
         # Actualizar el estado del juego
-        current_time = pygame.time.get_ticks()
+        current_time = self.now()
+        self.update_power_up_timers(current_time)
         
-        if self.ai_solving and self.ai_path:
+        if self.ai_solving and self.ai_algorithm == 'MCTS':
+            # Movimiento automatico elegido por MCTS en cada jugada
+            if current_time - self.last_move_time > self.move_delay:
+                planner = self.mcts
+                if planner is None or planner.moves is not self.cell_moves():
+                    # MCTS elegido con la IA ya en marcha, o agente creado para otro mapa
+                    planner = self.create_mcts_planner()
+                self.move_player_to(planner.choose_move())
+                self.solving_steps += 1
+                self.last_move_time = current_time + self.terrain_delay()
+        elif self.ai_solving and self.ai_path:
             # Movimiento automatico si la IA esta resolviendo
             if current_time - self.last_move_time > self.move_delay:
                 if self.ai_path:
-                    next_pos = self.ai_path[0]
+                    next_pos = self.ai_path.peek()
                     if self.is_safe(next_pos):
                         self.move_player_to(next_pos)
-                        self.ai_path.pop(0)
+                        self.ai_path.advance()
                     else:
                         # Recalcular ruta si la posicion no es segura
-                        self.ai_path = self.solve_maze_astar()
+                        self.replans += 1
+                        if self.ai_algorithm == 'ST-A*':
+                            self.ai_path = self.solve_maze_spacetime()
+                        elif self.ai_algorithm == 'Monedas':
+                            self.ai_path = self.solve_maze_route()
+                        elif self.ai_algorithm == 'Dijkstra':
+                            self.ai_path = self.solve_maze_dijkstra()
+                        else:
+                            self.ai_path = self.solve_maze_astar()
                         if not self.ai_path:
                             print("No se encontro un camino seguro. La IA no puede continuar.")
                             self.ai_solving = False
-                self.last_move_time = current_time
+                self.last_move_time = current_time + self.terrain_delay()
         else:
             # Movimiento manual del jugador
-            keys = pygame.key.get_pressed()
-            move_x = keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]
-            move_y = keys[pygame.K_DOWN] - keys[pygame.K_UP]
+            move_x, move_y = move
 
             if (move_x != 0 or move_y != 0) and current_time - self.last_move_time > self.move_delay:
                 self.move_player(move_x * self.block_size, move_y * self.block_size)
-                self.last_move_time = current_time
+                self.last_move_time = current_time + self.terrain_delay()
 
         self.update_floating_texts()
         self.check_collectibles()
@@ -415,121 +1093,142 @@ class Laberinto:
         # Verificar condiciones de victoria o derrota
         if self.player.colliderect(self.goal):
             self.show_win_screen()
+            if not self.running:
+                return
 
         elapsed_time = (current_time - self.start_time) / 1000
         if elapsed_time > self.time_limit:
             self.show_lose_screen("Se acabo el tiempo")
+            if not self.running:
+                return
 
-        if not self.invincible:
-            for enemy in self.enemies:
-                if self.player.colliderect(enemy):
-                    self.lose_life()
+        if not self.invincible and self.player.topleft in self.enemy_cells:
+            self.lose_life()
 
-        self.update_player_animation()
+        if not self.headless:
+            self.update_player_animation()
 
     def move_enemies(self):
         # Mover enemigos aleatoriamente
         directions = [(self.block_size, 0), (-self.block_size, 0), (0, self.block_size), (0, -self.block_size)]
         new_positions = []
         for enemy in self.enemies:
-            new_pos = enemy.move(random.choice(directions))
-            if not any(new_pos.colliderect(wall) for wall in self.maze):
+            new_pos = enemy.move(self.rng.choice(directions))
+            if not self.is_wall(new_pos.topleft):
                 new_positions.append(new_pos)
             else:
                 new_positions.append(enemy.copy())
 
-        # Evitar colisiones entre enemigos
-        for i, new_pos in enumerate(new_positions):
-            for j, other_pos in enumerate(new_positions):
-                if i != j and new_pos.colliderect(other_pos):
+        # Evitar colisiones entre enemigos: los que reclaman la misma celda se quedan donde estaban.
+        # Al quedarse pueden bloquear otra celda reclamada, asi que se repite hasta que no haya conflictos.
+        conflicts = True
+        while conflicts:
+            claims = {}
+            for new_pos in new_positions:
+                claims[new_pos.topleft] = claims.get(new_pos.topleft, 0) + 1
+            conflicts = False
+            for i, new_pos in enumerate(new_positions):
+                if claims[new_pos.topleft] > 1 and new_pos.topleft != self.enemies[i].topleft:
                     new_positions[i] = self.enemies[i].copy()
-                    break
-
-        for i, new_position in enumerate(new_positions):
-            self.paths.append(self.enemies[i].copy())
-            self.enemies[i] = new_position
+                    conflicts = True
+
+        moved = [i for i, new_position in enumerate(new_positions) if new_position.topleft != self.enemies[i].topleft]
+        old_positions = [self.enemies[i].topleft for i in moved]
+        for i in moved:
+            self.paths.add(self.enemies[i].topleft)
+            del self.enemy_cells[self.enemies[i].topleft]
+        for i in moved:
+            self.enemies[i] = new_positions[i]
+            self.enemy_cells[self.enemies[i].topleft] = i
+            self.remove_free_cell(self.enemies[i].topleft)
+        # Las celdas que quedan vacias vuelven al indice de celdas libres
+        for pos in old_positions:
+            self.add_free_cell(pos)
+        if moved:
+            self.move_danger_sources(old_positions, [self.enemies[i].topleft for i in moved])
+            self.danger_dirty = True
+            self.minimap_enemies_dirty = True
 
     def check_collectibles(self):
         # Verificar coleccion de monedas
-        for collectible in self.collectibles[:]:
-            if self.player.colliderect(collectible):
-                self.collectibles.remove(collectible)
-                self.paths.append(collectible)
-                self.score += 10
-                self.collect_sound.play()
-                self.create_collect_particles(collectible.center)
-                self.show_floating_text("+10", collectible.center, (255, 255, 0))
+        collectible = self.collectibles.pop(self.player.topleft, None)
+        if collectible is not None:
+            self.paths.add(collectible.topleft)
+            self.add_free_cell(collectible.topleft)
+            self.score += 10
+            self.play_sound(self.collect_sound)
+            self.create_collect_particles(collectible.center)
+            self.show_floating_text("+10", collectible.center, (255, 255, 0))
 
     def show_floating_text(self, text, position, color):
         # Mostrar texto flotante
+        if self.headless:
+            return
         self.floating_texts.append({
-            'text': self.small_font.render(text, True, color),
+            'text': self.render_text(text, color, self.small_font),
             'pos': list(position),
             'timer': 60
         })
 
-    def update_floating_texts(self):
+    def update_floating_texts(self, ticks=1):
         # Actualizar posicion y duracion de textos flotantes
         for text in self.floating_texts[:]:
-            text['pos'][1] -= 1
-            text['timer'] -= 1
+            text['pos'][1] -= ticks
+            text['timer'] -= ticks
             if text['timer'] <= 0:
                 self.floating_texts.remove(text)
 
     def check_power_ups(self):
         # Verificar coleccion de power-ups
-        for power_up in self.power_ups[:]:
-            if self.player.colliderect(power_up):
-                self.power_ups.remove(power_up)
-                self.paths.append(power_up)
-                power_up_type = random.choice(['speed', 'invincibility', 'time'])
-                self.activate_power_up(power_up_type)
-                self.collect_sound.play()
-                self.create_collect_particles(power_up.center)
+        power_up = self.power_ups.pop(self.player.topleft, None)
+        if power_up is not None:
+            self.paths.add(power_up.topleft)
+            self.add_free_cell(power_up.topleft)
+            power_up_type = self.rng.choice(['speed', 'invincibility', 'time'])
+            self.activate_power_up(power_up_type)
+            self.play_sound(self.collect_sound)
+            self.create_collect_particles(power_up.center)
     
     def activate_power_up(self, power_up_type):
         # Activar efecto del power-up
         if power_up_type == 'speed':
             self.move_delay = 75  # Movimiento mas rapido
-            pygame.time.set_timer(pygame.USEREVENT, 10000)  # Duracion de 10 segundos
+            self.power_up_timers['speed'] = self.now() + 10000  # Duracion de 10 segundos
         elif power_up_type == 'invincibility':
             self.invincible = True
-            pygame.time.set_timer(pygame.USEREVENT + 1, 5000)  # Duracion de 5 segundos
+            self.power_up_timers['invincibility'] = self.now() + 5000  # Duracion de 5 segundos
         elif power_up_type == 'time':
             self.time_limit += 30  # Agregar 30 segundos al tiempo limite
 
+    def update_power_up_timers(self, current_time):
+        # Desactivar los power-ups cuyo tiempo (simulado) ha expirado
+        for power_up_type, expiry in list(self.power_up_timers.items()):
+            if current_time >= expiry:
+                del self.power_up_timers[power_up_type]
+                if power_up_type == 'speed':
+                    self.move_delay = 150
+                elif power_up_type == 'invincibility':
+                    self.invincible = False
+
     def create_movement_particles(self, position):
         # Crear particulas de movimiento
-        for _ in range(5):
-            particle = {
-                'pos': list(position),
-                'vel': [random.uniform(-1, 1), random.uniform(-1, 1)],
-                'timer': 20
-            }
-            self.particles.append(particle)
+        if self.headless:
+            return
+        self.particles.emit(position, 5, 1, 20)
 
     def create_collect_particles(self, position):
         # Crear particulas al recoger items
-        for _ in range(20):
-            particle = {
-                'pos': list(position),
-                'vel': [random.uniform(-2, 2), random.uniform(-2, 2)],
-                'timer': 30,
-                'color': (255, 255, 0)
-            }
-            self.particles.append(particle)
+        if self.headless:
+            return
+        self.particles.emit(position, 20, 2, 30, color_index=1)
 
     def update_particles(self):
         # Actualizar posicion y duracion de particulas
-        for particle in self.particles[:]:
-            particle['pos'][0] += particle['vel'][0]
-            particle['pos'][1] += particle['vel'][1]
-            particle['timer'] -= 1
-            if particle['timer'] <= 0:
-                self.particles.remove(particle)
+        self.particles.update()
 
     def update_player_animation(self):
         # Actualizar animacion del jugador
+        self.ensure_assets()
         self.animation_timer += 1
         if self.animation_timer >= 10:
             self.current_frame = (self.current_frame + 1) % len(self.player_frames)
@@ -537,34 +1236,38 @@ class Laberinto:
 
     def draw(self):
         # Dibujar todos los elementos del juego
+        self.ensure_assets()
+        self.update_camera()
+        offset_x, offset_y = self.camera.topleft
+        half = self.block_size // 2
+
+        # Solo se dibuja lo que cae dentro de la camara: el coste no depende del tamano del mapa
         self.screen.blit(self.background, (0, 0))
-        for path in self.paths:
-            self.screen.blit(self.images['path'], path)
-        for wall in self.maze:
-            self.screen.blit(self.images['wall'], wall)
-        for enemy in self.enemies:
-            self.screen.blit(self.images['enemy'], enemy)
-        for collectible in self.collectibles:
-            self.screen.blit(self.images['coin'], collectible)
-            pulse = abs(math.sin(pygame.time.get_ticks() * 0.01)) * 5
-            pygame.draw.circle(self.screen, (255, 255, 0, 100), collectible.center, self.block_size // 2 + pulse, 2)
-
-        for power_up in self.power_ups:
-            self.screen.blit(self.images['power_up'], power_up)
-            glow = abs(math.sin(pygame.time.get_ticks() * 0.005)) * 10
-            pygame.draw.circle(self.screen, (0, 255, 255, 50), power_up.center, self.block_size // 2 + glow, 3)
-        self.screen.blit(self.player_frames[self.current_frame], self.player)
-        self.screen.blit(self.images['goal'], self.screen.blit(self.images['goal'], self.goal))
+        tiles, enemies, coins, power_ups = self.query_viewport()
+        self.screen.blits(tiles, False)
+        self.screen.blits([(self.images['enemy'], pos) for pos in enemies], False)
+        for x, y in coins:
+            self.screen.blit(self.images['coin'], (x, y))
+            pulse = abs(math.sin(self.now() * 0.01)) * 5
+            pygame.draw.circle(self.screen, (255, 255, 0, 100), (x + half, y + half), half + pulse, 2)
+
+        for x, y in power_ups:
+            self.screen.blit(self.images['power_up'], (x, y))
+            glow = abs(math.sin(self.now() * 0.005)) * 10
+            pygame.draw.circle(self.screen, (0, 255, 255, 100), (x + half, y + half), half + glow, 3)
+        player = self.player.move(-offset_x, -offset_y)
+        self.screen.blit(self.player_frames[self.current_frame], player)
+        self.screen.blit(self.images['goal'], self.screen.blit(self.images['goal'], self.goal.move(-offset_x, -offset_y)))
 
         # Efectos visuales de power-ups activos
         if self.invincible:
-            pygame.draw.circle(self.screen, (0, 255, 255, 100), self.player.center, self.block_size // 2 + 5, 2)
+            pygame.draw.circle(self.screen, (0, 255, 255, 100), player.center, self.block_size // 2 + 5, 2)
     
         if self.move_delay == 75:  # Power-up de velocidad activo
-            pygame.draw.circle(self.screen, (255, 165, 0, 100), self.player.center, self.block_size // 2 + 3, 2)
+            pygame.draw.circle(self.screen, (255, 165, 0, 100), player.center, self.block_size // 2 + 3, 2)
 
         for text in self.floating_texts:
-            self.screen.blit(text['text'], text['pos'])
+            self.screen.blit(text['text'], (text['pos'][0] - offset_x, text['pos'][1] - offset_y))
 
         # Mostrar power-ups activos
         active_powerups = []
@@ -577,12 +1280,10 @@ class Laberinto:
             self.draw_text(powerup, (self.screen.get_width() - 150, 50 + i * 30), color=(255, 255, 0))
         
         # Dibujar particulas
-        for particle in self.particles:
-            color = particle.get('color', (255, 255, 255))
-            pygame.draw.circle(self.screen, color, [int(p) for p in particle['pos']], 2)
+        self.particles.draw(self.screen, (offset_x, offset_y))
 
         # Mostrar informacion del juego
-        remaining_time = max(0, self.time_limit - (pygame.time.get_ticks() - self.start_time) / 1000)
+        remaining_time = max(0, self.time_limit - (self.now() - self.start_time) / 1000)
         self.draw_text(f"Tiempo: {int(remaining_time)}s", (10, 10))
         self.draw_text(f"Nivel: {self.level}", (10, 50))
         self.draw_text(f"Puntuacion: {self.score}", (10, 90))
@@ -597,16 +1298,28 @@ class Laberinto:
         self.bfs_button_rect = pygame.Rect(900, 420, 160, 50)
         self.greedy_button_rect = pygame.Rect(900, 480, 160, 50)
         self.astar_button_rect = pygame.Rect(900, 540, 160, 50)
+        self.mcts_button_rect = pygame.Rect(1080, 360, 160, 50)
+        self.spacetime_button_rect = pygame.Rect(1080, 420, 160, 50)
+        self.route_button_rect = pygame.Rect(1080, 480, 160, 50)
+        self.dijkstra_button_rect = pygame.Rect(1080, 540, 160, 50)
         
         pygame.draw.rect(self.screen, (0, 200, 0) if self.ai_algorithm == 'DFS' else (200, 0, 0), self.dfs_button_rect)
         pygame.draw.rect(self.screen, (0, 200, 0) if self.ai_algorithm == 'BFS' else (200, 0, 0), self.bfs_button_rect)
         pygame.draw.rect(self.screen, (0, 200, 0) if self.ai_algorithm == 'Greedy' else (200, 0, 0), self.greedy_button_rect)
         pygame.draw.rect(self.screen, (0, 200, 0) if self.ai_algorithm == 'A*' else (200, 0, 0), self.astar_button_rect)
+        pygame.draw.rect(self.screen, (0, 200, 0) if self.ai_algorithm == 'MCTS' else (200, 0, 0), self.mcts_button_rect)
+        pygame.draw.rect(self.screen, (0, 200, 0) if self.ai_algorithm == 'ST-A*' else (200, 0, 0), self.spacetime_button_rect)
+        pygame.draw.rect(self.screen, (0, 200, 0) if self.ai_algorithm == 'Monedas' else (200, 0, 0), self.route_button_rect)
+        pygame.draw.rect(self.screen, (0, 200, 0) if self.ai_algorithm == 'Dijkstra' else (200, 0, 0), self.dijkstra_button_rect)
         
         self.draw_text("DFS", (self.dfs_button_rect.x + 10, self.dfs_button_rect.y + 10))
         self.draw_text("BFS", (self.bfs_button_rect.x + 10, self.bfs_button_rect.y + 10))
         self.draw_text("Greedy", (self.greedy_button_rect.x + 10, self.greedy_button_rect.y + 10))
         self.draw_text("A*", (self.astar_button_rect.x + 10, self.astar_button_rect.y + 10))
+        self.draw_text("MCTS", (self.mcts_button_rect.x + 10, self.mcts_button_rect.y + 10))
+        self.draw_text("ST-A*", (self.spacetime_button_rect.x + 10, self.spacetime_button_rect.y + 10))
+        self.draw_text("Monedas", (self.route_button_rect.x + 10, self.route_button_rect.y + 10))
+        self.draw_text("Dijkstra", (self.dijkstra_button_rect.x + 10, self.dijkstra_button_rect.y + 10))
 
         # Show AI solution steps
         if self.ai_solving and self.solving_steps > 0:
@@ -614,31 +1327,148 @@ class Laberinto:
 
         self.draw_minimap()
 
+        if self.show_profiler:
+            self.draw_profiler()
+
         pygame.display.flip()
 
+    def update_camera(self):
+        # La camara sigue al jugador sin salirse del mapa; si el mapa cabe en pantalla no se mueve
+        map_width, map_height = self.grid_width * self.block_size, self.grid_height * self.block_size
+        self.camera.size = self.screen.get_size()
+        self.camera.center = self.player.center
+        self.camera.x = max(0, min(self.camera.x, map_width - self.camera.width))
+        self.camera.y = max(0, min(self.camera.y, map_height - self.camera.height))
+
+    def visible_cells(self):
+        # Rango de celdas [x0, x1) x [y0, y1) que intersecan la camara
+        block_size = self.block_size
+        return (max(0, self.camera.left // block_size), max(0, self.camera.top // block_size),
+                min(self.grid_width, -(-self.camera.right // block_size)),
+                min(self.grid_height, -(-self.camera.bottom // block_size)))
+
+    def query_viewport(self):
+        # Consulta espacial de la camara: recorre solo las celdas visibles y devuelve, ya en
+        # coordenadas de pantalla, las baldosas (para blits) y las posiciones de enemigos, monedas y power-ups
+        x0, y0, x1, y1 = self.visible_cells()
+        block_size, width = self.block_size, self.grid_width
+        offset_x, offset_y = self.camera.topleft
+        walls, costs, paths = self.walls, self.costs, self.paths
+        wall_image, path_image = self.images['wall'], self.images['path']
+        tiles, enemies, coins, power_ups = [], [], [], []
+        for y in range(y0, y1):
+            row = y * width
+            for x in range(x0, x1):
+                pos = (x * block_size, y * block_size)
+                screen_pos = (pos[0] - offset_x, pos[1] - offset_y)
+                if walls[row + x]:
+                    tiles.append((wall_image, screen_pos))
+                    continue
+                if pos in paths:
+                    tiles.append((path_image, screen_pos))
+                if costs[row + x] > 1:
+                    tiles.append((self.cost_overlays[costs[row + x]], screen_pos))
+                if pos in self.enemy_cells:
+                    enemies.append(screen_pos)
+                if pos in self.collectibles:
+                    coins.append(screen_pos)
+                if pos in self.power_ups:
+                    power_ups.append(screen_pos)
+        self.visible_cell_count = (x1 - x0) * (y1 - y0)
+        return tiles, enemies, coins, power_ups
+
+    def render_text(self, text, color=(255, 255, 255), font=None):
+        # Obtener la superficie de un texto, reutilizando las ya renderizadas
+        key = (font or self.font, text, color)
+        surface = self.static_texts.get(key)
+        if surface is not None:
+            self.text_cache_hits += 1
+            return surface
+
+        surface = self.text_cache.get(key)
+        if surface is not None:
+            self.text_cache.move_to_end(key)
+            self.text_cache_hits += 1
+            return surface
+
+        self.text_cache_misses += 1
+        surface = key[0].render(text, True, color)
+        self.text_cache[key] = surface
+        if len(self.text_cache) > self.text_cache_size:
+            self.text_cache.popitem(last=False)
+        return surface
+
     def draw_text(self, text, pos, color=(255, 255, 255)):
         # Dibujar texto en la pantalla
-        surface = self.font.render(text, True, color)
-        self.screen.blit(surface, pos)
+        self.screen.blit(self.render_text(text, color), pos)
+
+    def profiler_stats(self):
+        # Metricas de rendimiento mostradas en el perfilador
+        lookups = self.text_cache_hits + self.text_cache_misses
+        return {
+            'FPS': f"{self.clock.get_fps():.1f}",
+            'Cache texto': f"{len(self.text_cache)}/{self.text_cache_size}",
+            'Aciertos texto': f"{self.text_cache_hits} ({100 * self.text_cache_hits / lookups if lookups else 0:.1f}%)",
+            'Fallos texto': str(self.text_cache_misses),
+            'Particulas': f"{len(self.particles)}/{self.particles.capacity}",
+            'Replanificaciones IA': str(self.replans),
+            'Campo de peligro': f"{self.danger_updates} recalculos",
+            'Celdas visibles': f"{self.visible_cell_count}/{self.grid_width * self.grid_height}",
+            'Imagenes exportadas': f"{EXPORTER.exported} ({EXPORTER.pending()} en cola)",
+            'Carga de nivel': f"{self.level_load_ms:.1f} ms",
+            'Carga recursos': f"{ASSETS.total_load_ms():.0f} ms",
+            'Rollouts MCTS': f"{self.mcts.last_rollouts} ({self.mcts.rollouts_per_second:.0f}/s)" if self.mcts else "-",
+        }
+
+    def draw_profiler(self):
+        # Dibujar el perfilador (se renderiza sin cache para no alterar sus propias metricas)
+        for i, (name, value) in enumerate(self.profiler_stats().items()):
+            surface = self.small_font.render(f"{name}: {value}", True, (0, 255, 255))
+            self.screen.blit(surface, (10, 180 + i * 22))
+
+    def build_minimap_walls(self):
+        # Renderizar una sola vez por nivel la capa de muros del minimapa.
+        # La rejilla de ocupacion se usa directamente como imagen de 8 bits (un pixel por celda)
+        # y se reescala de una vez, en lugar de dibujar un rectangulo por muro.
+        minimap_size = 400
+        self.minimap_scale = minimap_size / max(self.screen.get_width(), self.screen.get_height(),
+                                                self.grid_width * self.block_size, self.grid_height * self.block_size)
+        cell_size = self.block_size * self.minimap_scale
+
+        self.minimap_walls = pygame.Surface((minimap_size, minimap_size))
+        self.minimap_walls.fill((0, 0, 0))
+        if self.walls:
+            grid_surface = pygame.image.frombuffer(bytes(self.walls), (self.grid_width, self.grid_height), 'P')
+            grid_surface.set_palette([(0, 0, 0), (100, 100, 100)])
+            size = (max(1, round(self.grid_width * cell_size)), max(1, round(self.grid_height * cell_size)))
+            self.minimap_walls.blit(pygame.transform.scale(grid_surface, size), (0, 0))
+
+        self.minimap_surface = pygame.Surface((minimap_size, minimap_size))
+        self.minimap_surface.set_alpha(128)
+        # Capa de marcadores de enemigos: se redibuja solo cuando se mueven (el negro es transparente)
+        self.minimap_enemies = pygame.Surface((minimap_size, minimap_size))
+        self.minimap_enemies.set_colorkey((0, 0, 0))
+        self.minimap_enemies_dirty = True
 
     def draw_minimap(self):
-        # Dibujar minimapa
-        minimap_size = 400
-        minimap_surface = pygame.Surface((minimap_size, minimap_size))
-        minimap_surface.set_alpha(128)
-        minimap_surface.fill((0, 0, 0))
+        # Dibujar minimapa: en cada frame solo se componen las capas y los marcadores del jugador y la meta
+        if self.minimap_walls is None:
+            self.build_minimap_walls()
 
-        scale_factor = minimap_size / max(self.screen.get_width(), self.screen.get_height())
+        minimap_size = 400
+        minimap_surface = self.minimap_surface
+        minimap_surface.blit(self.minimap_walls, (0, 0))
 
-        for wall in self.maze:
-            pygame.draw.rect(minimap_surface, (100, 100, 100), 
-                             (wall.x * scale_factor, wall.y * scale_factor, 
-                              wall.width * scale_factor, wall.height * scale_factor))
+        scale_factor = self.minimap_scale
 
-        for enemy in self.enemies:
-            pygame.draw.rect(minimap_surface, (255, 0, 0), 
-                             (enemy.x * scale_factor, enemy.y * scale_factor, 
-                              enemy.width * scale_factor, enemy.height * scale_factor))
+        if self.minimap_enemies_dirty:
+            self.minimap_enemies.fill((0, 0, 0))
+            for enemy in self.enemies:
+                pygame.draw.rect(self.minimap_enemies, (255, 0, 0),
+                                 (enemy.x * scale_factor, enemy.y * scale_factor,
+                                  enemy.width * scale_factor, enemy.height * scale_factor))
+            self.minimap_enemies_dirty = False
+        minimap_surface.blit(self.minimap_enemies, (0, 0))
 
         pygame.draw.rect(minimap_surface, (0, 255, 0), 
                          (self.player.x * scale_factor, self.player.y * scale_factor, 
@@ -648,10 +1478,27 @@ class Laberinto:
                          (self.goal.x * scale_factor, self.goal.y * scale_factor, 
                           self.goal.width * scale_factor, self.goal.height * scale_factor))
 
+        # Zona visible cuando el mapa no cabe en pantalla
+        if self.grid_width * self.block_size > self.camera.width or self.grid_height * self.block_size > self.camera.height:
+            pygame.draw.rect(minimap_surface, (255, 255, 255),
+                             (self.camera.x * scale_factor, self.camera.y * scale_factor,
+                              self.camera.width * scale_factor, self.camera.height * scale_factor), 1)
+
         self.screen.blit(minimap_surface, (self.screen.get_width() - minimap_size - 10, 10))
 
     def show_instructions(self):
-        # Mostrar pantalla de instrucciones
+        # Mostrar pantalla de instrucciones y aprovechar la espera para cargar las imagenes
+        self.draw_instructions()
+        self.ensure_assets()
+        waiting = True
+        while waiting:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.quit_game()
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                    waiting = False
+
+    def draw_instructions(self):
         overlay = pygame.Surface((self.screen.get_width(), self.screen.get_height()))
         overlay.set_alpha(200)
         overlay.fill((0, 0, 0))
@@ -664,7 +1511,8 @@ class Laberinto:
             "-Coge potenciadores para habilidades especiales",
             "-Evitar enemigos",
             "-Llegar a la meta antes de que acabe el tiempo",
-            "-Presiona DFS o BFS para elegir el algoritmo de resolucion",
+            "-Las casillas oscuras (2-9 en el mapa) son lentas",
+            "-Elige el algoritmo: DFS, BFS, Greedy, A*, MCTS, ST-A*, Monedas o Dijkstra",
             "-Activa la IA para resolver el laberinto automaticamente",
             "-Presiona ESPACIO para comenzar"
         ]
@@ -674,21 +1522,26 @@ class Laberinto:
             self.draw_text(instruction, (self.screen.get_width() // 2 - 150, 200 + i * 40))
 
         pygame.display.flip()
-        waiting = True
-        while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.quit_game()
-                if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-                    waiting = False
+        if self.startup_ms is None:
+            self.startup_ms = (time.perf_counter() - self.created_at) * 1000
 
     def show_win_screen(self):
         # Muestra la pantalla de victoria y pasa al siguiente nivel
+        if self.headless:
+            self.outcome = 'win'
+            self.running = False
+            return
+        self.save_recording('win')
         self.show_message_screen("¡Has ganado!", (0, 255, 0))
         self.next_level()
 
     def show_lose_screen(self, message):
         # Muestra la pantalla de derrota y reinicia el nivel
+        if self.headless:
+            self.outcome = 'lose'
+            self.running = False
+            return
+        self.save_recording('lose')
         self.show_message_screen(message, (255, 0, 0))
         self.reset_level()
 
@@ -710,6 +1563,28 @@ class Laberinto:
         pygame.display.flip()
         pygame.time.wait(3000)
 
+    def start_recording(self):
+        # Grabar la partida desde el tick 0 hasta que termine el nivel (ver repeticion.py).
+        # Sin semilla la partida no seria reproducible, asi que se elige una
+        from repeticion import ReplayRecorder
+
+        if self.seed is None:
+            self.seed = random.randrange(2 ** 32)
+            self.rng.seed(self.seed)
+            self.initial_state = self.snapshot()
+        self.recorder = ReplayRecorder(self.level, self.seed, self.block_size)
+        self.mcts_rollouts = REPLAY_MCTS_ROLLOUTS
+        if self.mcts is not None:
+            self.mcts.max_rollouts = self.mcts_rollouts
+
+    def save_recording(self, outcome):
+        # Con ventana el nivel no se detiene al terminar: se guarda la repeticion y se deja de grabar
+        if self.recorder is not None:
+            self.outcome = outcome
+            self.recorder.save(self, f"repeticion_nivel{self.level}_{self.seed}.rep")
+            self.outcome = None
+            self.recorder = None
+
     def next_level(self):
         # Carga el siguiente nivel o muestra la pantalla de juego completado
         if self.level < 5:
@@ -719,30 +1594,94 @@ class Laberinto:
             self.show_game_complete_screen()
 
     def start_new_level(self):
-        # Carga el mapa del nuevo nivel y muestra las instrucciones
-        self.load_map(f"maps/level{self.level}.txt")
+        # Carga el mapa del nuevo nivel (ya preparado en segundo plano si es posible) y muestra las instrucciones
+        start = time.perf_counter()
+        prefetched = self.prefetched_level
+        if prefetched is not None and prefetched.level == self.level:
+            self.adopt_map(prefetched.future.result())
+        else:
+            self.load_map(self.map_path())
+        self.level_load_ms = (time.perf_counter() - start) * 1000
         self.ai_solving = False
-        self.ai_path = []
-        self.start_time = pygame.time.get_ticks()
+        self.ai_path = RunPath()
+        self.mcts = None
+        self.start_time = self.now()
+        self.initial_state = self.snapshot()
+        self.prefetch_next_level()
         self.show_instructions()
 
+    def prefetch_next_level(self):
+        # Leer el mapa del siguiente nivel y construir sus indices en un hilo mientras se juega este
+        self.prefetched_level = None
+        if self.level < 5:
+            level = self.level + 1
+            self.prefetched_level = PrefetchedLevel(level, PREFETCHER.submit(prefetch_level, level))
+
+    def adopt_map(self, game):
+        # Sustituir el mapa actual por el de otra partida (la precargada), sin volver a procesarlo
+        for field in MAP_FIELDS:
+            setattr(self, field, getattr(game, field))
+
     def reset_level(self):
-        # Reinicia el nivel actual
-        self.__init__(self.level)
+        # Reinicia el nivel actual restaurando el estado guardado al cargarlo (sin recargar recursos)
+        self.restore(self.initial_state)
+        self.score = 0
+        self.lives = 3
+        self.ai_solving = False
+        self.ai_path = RunPath()
+        self.mcts = None
+        self.particles.clear()
+        self.floating_texts = []
+        if self.recorder is not None:
+            # El nivel vuelve al tick 0: la repeticion empieza de nuevo desde el reinicio
+            self.start_recording()
+
+    def snapshot(self):
+        # Capturar el estado de la partida en un GameState
+        return GameState(
+            self.tick, self.player.topleft, tuple(enemy.topleft for enemy in self.enemies),
+            tuple(self.collectibles), tuple(self.power_ups), frozenset(self.paths),
+            self.score, self.lives, self.time_limit, self.start_time, self.last_move_time, self.last_enemy_move_time,
+            self.move_delay, self.invincible, tuple(self.power_up_timers.items()), self.running, self.outcome,
+            self.rng.getstate(),
+        )
+
+    def restore(self, state):
+        # Volver a un estado capturado con snapshot()
+        size = (self.block_size, self.block_size)
+        self.tick = state.tick
+        self.player.topleft = state.player
+        self.enemies = [pygame.Rect(pos, size) for pos in state.enemies]
+        self.index_enemies()
+        self.collectibles = {pos: pygame.Rect(pos, size) for pos in state.collectibles}
+        self.power_ups = {pos: pygame.Rect(pos, size) for pos in state.power_ups}
+        self.paths = set(state.paths)
+        self.rebuild_free_cells()
+        self.score = state.score
+        self.lives = state.lives
+        self.time_limit = state.time_limit
+        self.start_time = state.start_time
+        self.last_move_time = state.last_move_time
+        self.last_enemy_move_time = state.last_enemy_move_time
+        self.move_delay = state.move_delay
+        self.invincible = state.invincible
+        self.power_up_timers = dict(state.power_up_timers)
+        self.running = state.running
+        self.outcome = state.outcome
+        self.rng.setstate(state.rng_state)
 
     def lose_life(self):
         # Quita una vida al jugador y muestra la pantalla de derrota si se quedan sin vidas
         self.lives -= 1
-        self.lose_life_sound.play()
+        self.play_sound(self.lose_life_sound)
         if self.lives <= 0:
             self.show_lose_screen("¡Te has quedado sin vidas!")
         else:
             self.player.topleft = self.get_safe_position()
 
     def get_safe_position(self):
-        # Encuentra una posicion segura para el jugador
-        safe_positions = [rect for rect in self.paths if not any(enemy.colliderect(rect) for enemy in self.enemies)]
-        return random.choice(safe_positions).topleft if safe_positions else self.player.topleft
+        # Encuentra una posicion segura para el jugador: una celda libre al azar del indice
+        return self.rng.choice(self.free_cells) if self.free_cells else self.player.topleft
 
     def show_game_complete_screen(self):
         # Muestra la pantalla de juego completado
@@ -767,9 +1706,224 @@ class Laberinto:
         pygame.quit()
         sys.exit()
 
+
+class MundoLaberinto(Laberinto):
+    # Partida sobre un mundo troceado (.labt, ver mundo.py) demasiado grande para tenerlo entero en memoria.
+    # Muros y costes se consultan en el ChunkedMap, que carga los trozos alrededor del jugador y de la camara.
+    # Los enemigos, monedas y power-ups solo existen como objetos en los trozos cargados: al cargar un trozo
+    # se sacan de sus celdas y al expulsarlo se vuelven a escribir en ellas, donde esten en ese momento.
+    # Los indices del mapa completo (componentes, campo de peligro, tabla de movimientos) no se construyen,
+    # asi que la IA solo tiene A* en streaming (ChunkedMap.solve) y no se exportan imagenes de la solucion.
+    def __init__(self, world_path, headless=False, clock=None, seed=None, max_chunks=64):
+        self.world_path = world_path
+        self.world = None
+        self.max_chunks = max_chunks
+        self.active_radius = 32  # Celdas alrededor del jugador que se mantienen cargadas
+        super().__init__(1, headless, clock, seed)
+
+    def map_path(self):
+        return self.world_path
+
+    def load_map(self, filepath):
+        # Solo se lee la cabecera y los trozos alrededor del jugador
+        if self.world is not None:
+            self.world.close()
+        self.world = world = ChunkedMap(filepath, self.max_chunks)
+        block_size = self.block_size
+        self.grid_width, self.grid_height = world.width, world.height
+        self.maze = []
+        self.walls = bytearray()
+        self.costs = bytearray()
+        self.weighted_cells = {}
+        self.enemies = []
+        self.paths = set()
+        self.collectibles = {}
+        self.power_ups = {}
+        self.player = pygame.Rect(world.player[0] * block_size, world.player[1] * block_size, block_size, block_size)
+        self.goal = pygame.Rect(world.goal[0] * block_size, world.goal[1] * block_size, block_size, block_size)
+        # Tiempo de sobra para recorrer todo el suelo de un laberinto perfecto (la mitad de las celdas)
+        self.time_limit = max(120, world.width * world.height // 2 * self.move_delay // 1000)
+        self.live_chunks = set()  # Trozos cuyos enemigos y objetos ya se han sacado de las celdas
+        self.seen_evictions = world.evictions
+        self.index_enemies()
+        self.rebuild_free_cells()
+        self.minimap_walls = None
+        self.move_table = None
+        self.load_active_chunks()
+
+    def load_active_chunks(self):
+        x, y = self.player.centerx // self.block_size, self.player.centery // self.block_size
+        self.sync_chunks(self.world.load_around(x, y, self.active_radius))
+
+    def sync_chunks(self, keys):
+        # Activar los trozos de keys que aun no lo esten y devolver a sus celdas lo de los trozos expulsados
+        for key in keys:
+            if key not in self.live_chunks:
+                self.spawn_chunk(key)
+        if self.world.evictions != self.seen_evictions:
+            self.seen_evictions = self.world.evictions
+            self.park_evicted()
+
+    def spawn_chunk(self, key):
+        world, block_size, size = self.world, self.block_size, self.world.chunk_size
+        data = world.chunk(*key)
+        for char in b'MCU':
+            offset = data.find(char)
+            while offset >= 0:
+                x, y = key[0] * size + offset % size, key[1] * size + offset // size
+                rect = pygame.Rect(x * block_size, y * block_size, block_size, block_size)
+                if char == ord('M'):
+                    self.enemy_cells[rect.topleft] = len(self.enemies)
+                    self.enemies.append(rect)
+                elif char == ord('C'):
+                    self.collectibles[rect.topleft] = rect
+                else:
+                    self.power_ups[rect.topleft] = rect
+                world.set_cell(x, y, '.')
+                offset = data.find(char, offset + 1)
+        self.live_chunks.add(key)
+        self.minimap_enemies_dirty = True
+
+    def park_evicted(self):
+        # Lo que este en un trozo que ya no esta en memoria vuelve a sus celdas (como cambio pendiente).
+        # Si un enemigo y una moneda coinciden en una celda, se queda la moneda
+        world, block_size, size = self.world, self.block_size, self.world.chunk_size
+
+        def evicted(pos):
+            return (pos[0] // block_size // size, pos[1] // block_size // size) not in world.chunks
+
+        def park(pos, char):
+            world.set_cell(pos[0] // block_size, pos[1] // block_size, char)
+
+        self.live_chunks = {key for key in self.live_chunks if key in world.chunks}
+        parked = [enemy for enemy in self.enemies if evicted(enemy.topleft)]
+        if parked:
+            self.enemies = [enemy for enemy in self.enemies if not evicted(enemy.topleft)]
+            self.index_enemies()
+            for enemy in parked:
+                park(enemy.topleft, 'M')
+        for items, char in ((self.collectibles, 'C'), (self.power_ups, 'U')):
+            for pos in [pos for pos in items if evicted(pos)]:
+                del items[pos]
+                park(pos, char)
+
+    def step(self, move=(0, 0)):
+        self.load_active_chunks()
+        super().step(move)
+
+    def update_camera(self):
+        super().update_camera()
+        block_size = self.block_size
+        radius = max(self.camera.size) // block_size // 2 + 1
+        self.sync_chunks(self.world.load_around(self.camera.centerx // block_size, self.camera.centery // block_size, radius))
+
+    def is_wall(self, pos):
+        return self.world.is_wall(pos[0] // self.block_size, pos[1] // self.block_size)
+
+    def cell_cost(self, pos):
+        char = self.world.cell(pos[0] // self.block_size, pos[1] // self.block_size)
+        return char - ord('0') if ord('2') <= char <= ord('9') else 1
+
+    def danger_at(self, pos):
+        # Sin campo de peligro: distancia (en celdas) al enemigo activo mas cercano
+        block_size = self.block_size
+        return min([(abs(enemy.x - pos[0]) + abs(enemy.y - pos[1])) // block_size for enemy in self.enemies] + [255])
+
+    def is_reachable(self, a, b):
+        # Sin componentes precalculadas: la busqueda termina sin camino si la meta no es alcanzable
+        return True
+
+    def query_viewport(self):
+        x0, y0, x1, y1 = self.visible_cells()
+        block_size = self.block_size
+        offset_x, offset_y = self.camera.topleft
+        wall_image, path_image = self.images['wall'], self.images['path']
+        tiles, enemies, coins, power_ups = [], [], [], []
+        for x, y, char in self.world.region(x0, y0, x1, y1):
+            pos = (x * block_size, y * block_size)
+            screen_pos = (pos[0] - offset_x, pos[1] - offset_y)
+            if char == ord('#'):
+                tiles.append((wall_image, screen_pos))
+                continue
+            tiles.append((path_image, screen_pos))
+            if ord('2') <= char <= ord('9'):
+                tiles.append((self.cost_overlays[char - ord('0')], screen_pos))
+            if pos in self.enemy_cells:
+                enemies.append(screen_pos)
+            if pos in self.collectibles:
+                coins.append(screen_pos)
+            if pos in self.power_ups:
+                power_ups.append(screen_pos)
+        self.visible_cell_count = (x1 - x0) * (y1 - y0)
+        return tiles, enemies, coins, power_ups
+
+    def get_safe_position(self):
+        # Una celda de suelo al azar del trozo del jugador, sin enemigos
+        block_size, size = self.block_size, self.world.chunk_size
+        cx, cy = self.player.x // block_size // size, self.player.y // block_size // size
+        data = self.world.chunk(cx, cy)
+        cells = [((cx * size + offset % size) * block_size, (cy * size + offset // size) * block_size)
+                 for offset in range(len(data)) if data[offset] != ord('#')]
+        cells = [pos for pos in cells if pos not in self.enemy_cells]
+        return self.rng.choice(cells) if cells else self.player.topleft
+
+    def select_algorithm(self, algorithm):
+        # Los demas algoritmos necesitan los indices del mapa completo
+        if algorithm != 'A*':
+            print(f"{algorithm} no esta disponible en mundos troceados: se usa A*")
+            algorithm = 'A*'
+        super().select_algorithm(algorithm)
+
+    def switch_ai_solving(self):
+        if self.ai_algorithm is not None and self.ai_algorithm != 'A*':
+            self.select_algorithm(self.ai_algorithm)
+        super().switch_ai_solving()
+
+    def solve_maze_astar(self):
+        # Los muros del mundo no cambian: si la ruta en curso sigue junto al jugador (p. ej. un enemigo
+        # tapa la siguiente celda) se conserva y se espera, en lugar de volver a buscar en todo el mundo
+        block_size = self.block_size
+        x, y = self.player.topleft
+        if self.ai_path and abs(self.ai_path.peek()[0] - x) + abs(self.ai_path.peek()[1] - y) == block_size:
+            return self.ai_path
+        path = self.world.solve((x // block_size, y // block_size),
+                                (self.goal.x // block_size, self.goal.y // block_size))
+        if not path:
+            return RunPath()
+        return RunPath((path.head[0] * block_size, path.head[1] * block_size),
+                       [(dx * block_size, dy * block_size, count) for dx, dy, count in path.runs])
+
+    def restore_enemies(self):
+        # Los enemigos del mundo siguen donde esten al apagar la IA
+        pass
+
+    def save_solution_image(self):
+        # El exportador trabaja con la rejilla del mapa completo
+        pass
+
+    def prefetch_next_level(self):
+        self.prefetched_level = None
+
+    def next_level(self):
+        self.show_game_complete_screen()
+
+    def reset_level(self):
+        # Volver a abrir el mundo descarta los cambios guardados (monedas recogidas, enemigos movidos...)
+        self.load_map(self.world_path)
+        super().reset_level()
+
+
 if __name__ == "__main__":
+    if "--world" in sys.argv:
+        # Jugar un mundo troceado: python laberinto2.py --world mundo.labt
+        laberinto = MundoLaberinto(sys.argv[sys.argv.index("--world") + 1])
+        laberinto.run()
+        pygame.quit()
+        sys.exit()
     for level in range(1, 6):
         laberinto = Laberinto(level)
+        if "--record" in sys.argv:
+            laberinto.start_recording()
         laberinto.run()
         if not laberinto.running:
             break
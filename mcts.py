@@ -0,0 +1,188 @@
+import math
+import random
+import time
+from collections import deque
+
+
+class MCTSNode:
+    # Nodo del arbol: estadisticas de una secuencia de jugadas del jugador
+    __slots__ = ('visits', 'value', 'children', 'untried')
+
+    def __init__(self, actions):
+        self.visits = 0
+        self.value = 0.0
+        self.children = {}
+        self.untried = list(actions)
+
+
+class MCTSPlanner:
+    # Agente de busqueda en arbol Monte-Carlo que elige la siguiente jugada del jugador.
+    # El arbol es de bucle abierto: solo guarda las jugadas del jugador y en cada simulacion
+    # se vuelve a sortear el movimiento aleatorio de los enemigos, igual que move_enemies.
+    # Las simulaciones trabajan con indices de celda (y * ancho + x) en lugar de rects.
+    def __init__(self, game, time_budget_ms=10, max_rollouts=None, horizon=16, exploration=1.0, seed=None):
+        self.game = game
+        self.time_budget_ms = time_budget_ms
+        self.max_rollouts = max_rollouts  # Si se indica, sustituye al presupuesto de tiempo (resultados reproducibles)
+        self.horizon = horizon
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+
+        self.width = game.grid_width
+        self.block_size = game.block_size
+        # Para cada celda, la celda destino en cada una de las 4 direcciones (ella misma si hay muro)
+        self.moves = game.cell_moves()
+
+        # Valor de ser atrapado: perder la ultima vida es mucho peor que perder una de varias
+        self.caught_value = -1.0
+        self.goal = self.cell(game.goal.topleft)
+        self.distances = self.distance_field(self.goal)
+
+        # Estadisticas de rendimiento
+        self.last_rollouts = 0
+        self.rollouts_per_second = 0.0
+        self.total_rollouts = 0
+
+    def cell(self, pos):
+        return (pos[1] // self.block_size) * self.width + pos[0] // self.block_size
+
+    def position(self, cell):
+        return ((cell % self.width) * self.block_size, (cell // self.width) * self.block_size)
+
+    def actions(self, cell):
+        # Jugadas posibles: quedarse o moverse a una celda vecina libre
+        return list(dict.fromkeys((cell,) + self.moves[cell]))
+
+    def distance_field(self, source):
+        # BFS sobre los muros estaticos: distancia en pasos de cada celda hasta source
+        distances = [math.inf] * len(self.moves)
+        distances[source] = 0
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            for neighbor in self.moves[current]:
+                if distances[neighbor] == math.inf:
+                    distances[neighbor] = distances[current] + 1
+                    queue.append(neighbor)
+        return distances
+
+    def move_enemies(self, enemies):
+        # Mismo modelo que Laberinto.move_enemies: direccion aleatoria, los conflictos se quedan quietos
+        moves, rng = self.moves, self.rng
+        new_positions = [moves[enemy][rng.randrange(4)] for enemy in enemies]
+        conflicts = True
+        while conflicts:
+            claims = {}
+            for cell in new_positions:
+                claims[cell] = claims.get(cell, 0) + 1
+            conflicts = False
+            for i, cell in enumerate(new_positions):
+                if claims[cell] > 1 and cell != enemies[i]:
+                    new_positions[i] = enemies[i]
+                    conflicts = True
+        return new_positions
+
+    def advance(self, player, enemies, clock, elapsed):
+        # Tras mover al jugador: mover enemigos si toca y comprobar el resultado
+        # (1 = meta alcanzada, -1 = atrapado, 0 = nada)
+        if player == self.goal:
+            return enemies, clock, elapsed, 1
+        vulnerable = elapsed >= self.invincible_ms
+        if vulnerable and player in enemies:
+            return enemies, clock, elapsed, -1
+        if clock >= self.enemy_interval:
+            enemies = self.move_enemies(enemies)
+            clock -= self.enemy_interval
+            if vulnerable and player in enemies:
+                return enemies, clock, elapsed, -1
+        return enemies, clock + self.move_interval, elapsed + self.move_interval, 0
+
+    def rollout_action(self, player, enemies):
+        # Politica por defecto: acercarse a la meta evitando enemigos, con algo de aleatoriedad
+        actions = [cell for cell in self.actions(player) if cell not in enemies] or [player]
+        if self.rng.random() < 0.75:
+            return min(actions, key=self.distances.__getitem__)
+        return self.rng.choice(actions)
+
+    def evaluate(self, start, player):
+        # Valor de un estado no terminal: progreso hacia la meta respecto al inicio
+        progress = (self.distances[start] - self.distances[player]) / self.horizon
+        return max(-0.5, min(0.5, 0.5 * progress))
+
+    def select(self, node):
+        log_visits = math.log(node.visits)
+        return max(node.children.items(),
+                   key=lambda item: item[1].value / item[1].visits
+                   + self.exploration * math.sqrt(log_visits / item[1].visits))
+
+    def run_iteration(self, root, player, enemies, clock):
+        start = player
+        node = root
+        path = [root]
+        depth = 0
+        elapsed = 0.0
+        result = 0
+
+        # Seleccion y expansion
+        while depth < self.horizon:
+            expanded = bool(node.untried)
+            if expanded:
+                action = node.untried.pop(self.rng.randrange(len(node.untried)))
+                child = MCTSNode(self.actions(action))
+                node.children[action] = child
+                node = child
+            else:
+                action, node = self.select(node)
+            player = action
+            enemies, clock, elapsed, result = self.advance(player, enemies, clock, elapsed)
+            path.append(node)
+            depth += 1
+            if result or expanded:
+                break
+
+        # Simulacion con la politica por defecto
+        while not result and depth < self.horizon:
+            player = self.rollout_action(player, enemies)
+            enemies, clock, elapsed, result = self.advance(player, enemies, clock, elapsed)
+            depth += 1
+
+        if result < 0:
+            value = self.caught_value
+        else:
+            value = result if result else self.evaluate(start, player)
+        for visited in path:
+            visited.visits += 1
+            visited.value += value
+
+    def choose_move(self):
+        # Elegir la siguiente posicion del jugador (en pixeles) dentro del presupuesto de tiempo
+        game = self.game
+        self.move_interval = game.interval_ms(game.move_delay)
+        self.enemy_interval = game.interval_ms(game.enemy_move_delay)
+        self.invincible_ms = game.power_up_timers.get('invincibility', game.now()) - game.now() if game.invincible else 0
+        self.caught_value = -1.0 if game.lives <= 1 else -0.4
+
+        player = self.cell(game.player.topleft)
+        enemies = [self.cell(enemy.topleft) for enemy in game.enemies]
+        clock = game.now() - game.last_enemy_move_time
+        root = MCTSNode(self.actions(player))
+
+        start = time.perf_counter()
+        deadline = start + self.time_budget_ms / 1000
+        rollouts = 0
+        while True:
+            self.run_iteration(root, player, enemies, clock)
+            rollouts += 1
+            if self.max_rollouts is not None:
+                if rollouts >= self.max_rollouts:
+                    break
+            elif time.perf_counter() >= deadline:
+                break
+        elapsed = time.perf_counter() - start
+
+        self.last_rollouts = rollouts
+        self.total_rollouts += rollouts
+        self.rollouts_per_second = rollouts / elapsed if elapsed > 0 else 0.0
+
+        best = max(root.children.items(), key=lambda item: item[1].visits)[0]
+        return self.position(best)
@@ -0,0 +1,297 @@
+import argparse
+import heapq
+import random
+import struct
+import time
+from array import array
+from collections import OrderedDict
+
+from caminos import RunPath
+
+# Formato de mundo troceado (.labt): una cabecera fija seguida de todos los trozos, cada uno de
+# chunk_size x chunk_size bytes con los mismos caracteres que los mapas .txt ('#', '.', 'M', ...).
+# Todos los trozos ocupan lo mismo, asi que cualquiera se lee con un seek directo sin indice.
+MAGIC = b'LABT'
+VERSION = 1
+HEADER = struct.Struct('<4sHIIHIIII')  # magic, version, ancho, alto, lado del trozo, jugador x/y, meta x/y
+
+# Estado de busqueda por celda en ChunkedMap.solve: 0 = sin visitar, 1-4 = direccion desde la que
+# se llego (indice en DIRECTIONS + 1), START = inicio, WALL = muro
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+START = 5
+WALL = 255
+SEARCH_CELLS = bytes(WALL if char == ord('#') else 0 for char in range(256))  # Tabla para bytes.translate
+UNSEEN = 0xFFFFFFFF
+
+
+class ChunkWriter:
+    # Escribe un mundo fila a fila: solo guarda en memoria chunk_size filas a la vez
+    def __init__(self, filepath, width, height, player, goal, chunk_size=64):
+        self.file = open(filepath, 'wb')
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.rows = []
+        self.file.write(HEADER.pack(MAGIC, VERSION, width, height, chunk_size, *player, *goal))
+
+    def write_row(self, row):
+        self.rows.append(row.ljust(self.width, b'#')[:self.width])
+        if len(self.rows) == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        # Volcar una fila de trozos completa (las filas y columnas que faltan se rellenan con muro)
+        size = self.chunk_size
+        rows = self.rows + [b'#' * self.width] * (size - len(self.rows))
+        for x in range(0, self.width, size):
+            self.file.write(b''.join(row[x:x + size].ljust(size, b'#') for row in rows))
+        self.rows = []
+
+    def close(self):
+        if self.rows:
+            self.flush()
+        self.file.close()
+
+
+def convert_map(txt_path, out_path, chunk_size=64):
+    # Convertir un mapa .txt al formato troceado leyendolo en streaming (dos pasadas)
+    width = height = 0
+    player = goal = (0, 0)
+    with open(txt_path, 'rb') as file:
+        for y, line in enumerate(file):
+            line = line.strip()
+            width = max(width, len(line))
+            height = y + 1
+            if b'P' in line:
+                player = (line.index(b'P'), y)
+            if b'E' in line:
+                goal = (line.index(b'E'), y)
+
+    writer = ChunkWriter(out_path, width, height, player, goal, chunk_size)
+    with open(txt_path, 'rb') as file:
+        for line in file:
+            writer.write_row(line.strip())
+    writer.close()
+
+
+def generate_world(out_path, width, height, chunk_size=64, seed=None, item_rate=0.002):
+    # Generar un laberinto enorme con el algoritmo sidewinder, que construye fila a fila y solo
+    # necesita recordar la fila anterior: el mundo completo nunca esta en memoria
+    rng = random.Random(seed)
+    cells_x, cells_y = (width - 1) // 2, (height - 1) // 2
+    width, height = 2 * cells_x + 1, 2 * cells_y + 1
+    writer = ChunkWriter(out_path, width, height, (1, 1), (width - 2, height - 2), chunk_size)
+
+    def scatter(row):
+        # Repartir enemigos, monedas y power-ups sobre el suelo
+        for x in range(len(row)):
+            if row[x] == ord('.') and rng.random() < item_rate:
+                row[x] = ord(rng.choice('MCU'))
+
+    writer.write_row(b'#' * width)
+    for cy in range(cells_y):
+        north = bytearray(b'#' * width)
+        row = bytearray(b'#' * width)
+        run_start = 0
+        for cx in range(cells_x):
+            row[2 * cx + 1] = ord('.')
+            last = cx == cells_x - 1
+            if cy == 0:
+                # La primera fila es un pasillo continuo
+                if not last:
+                    row[2 * cx + 2] = ord('.')
+            elif last or rng.random() < 0.5:
+                # Cerrar el tramo y abrir hacia el norte desde una celda al azar del tramo
+                north[2 * rng.randint(run_start, cx) + 1] = ord('.')
+                run_start = cx + 1
+            else:
+                row[2 * cx + 2] = ord('.')
+        if cy == 0:
+            row[1] = ord('P')
+        if cy == cells_y - 1:
+            row[width - 2] = ord('E')
+        scatter(row)
+        if cy > 0:
+            writer.write_row(bytes(north))
+        writer.write_row(bytes(row))
+    writer.write_row(b'#' * width)
+    writer.close()
+
+
+class ChunkedMap:
+    # Mundo leido bajo demanda: los trozos se cargan del disco al consultarlos y se expulsan con
+    # politica LRU cuando hay mas de max_chunks en memoria. Los cambios (monedas recogidas, muros
+    # abiertos...) se guardan aparte para que sobrevivan a la expulsion del trozo.
+    def __init__(self, filepath, max_chunks=64):
+        self.file = open(filepath, 'rb')
+        magic, version, self.width, self.height, self.chunk_size, px, py, gx, gy = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filepath} no es un mundo troceado valido")
+        self.player = (px, py)
+        self.goal = (gx, gy)
+        self.chunks_x = -(-self.width // self.chunk_size)
+        self.chunks_y = -(-self.height // self.chunk_size)
+        self.chunk_bytes = self.chunk_size * self.chunk_size
+
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()  # (cx, cy) -> bytearray, del menos al mas usado
+        self.changes = {}  # (cx, cy) -> {desplazamiento: caracter}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.last_key = None  # Ultimo trozo consultado: casi todas las consultas seguidas caen en el
+        self.last_data = None
+
+    def close(self):
+        self.file.close()
+
+    def chunk(self, cx, cy):
+        key = (cx, cy)
+        if key == self.last_key:
+            self.hits += 1
+            return self.last_data
+        data = self.chunks.get(key)
+        if data is not None:
+            self.hits += 1
+            self.chunks.move_to_end(key)
+            self.last_key, self.last_data = key, data
+            return data
+
+        self.misses += 1
+        self.file.seek(HEADER.size + (cy * self.chunks_x + cx) * self.chunk_bytes)
+        data = bytearray(self.file.read(self.chunk_bytes))
+        for offset, char in self.changes.get(key, {}).items():
+            data[offset] = char
+        self.chunks[key] = data
+        if len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+            self.evictions += 1
+        self.last_key, self.last_data = key, data
+        return data
+
+    def cell(self, x, y):
+        # Caracter de una celda; fuera del mundo se considera muro
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return ord('#')
+        size = self.chunk_size
+        return self.chunk(x // size, y // size)[(y % size) * size + x % size]
+
+    def set_cell(self, x, y, char):
+        # Si el trozo no esta en memoria basta con anotar el cambio: se aplica al volver a leerlo
+        size = self.chunk_size
+        key, offset = (x // size, y // size), (y % size) * size + x % size
+        self.changes.setdefault(key, {})[offset] = ord(char)
+        data = self.chunks.get(key)
+        if data is not None:
+            data[offset] = ord(char)
+
+    def is_wall(self, x, y):
+        return self.cell(x, y) == ord('#')
+
+    def load_around(self, x, y, radius):
+        # Precargar los trozos a radius celdas o menos de (x, y), p. ej. alrededor de la camara.
+        # Devuelve sus claves (cx, cy)
+        size = self.chunk_size
+        keys = []
+        for cy in range(max(0, (y - radius) // size), min(self.chunks_y, (y + radius) // size + 1)):
+            for cx in range(max(0, (x - radius) // size), min(self.chunks_x, (x + radius) // size + 1)):
+                self.chunk(cx, cy)
+                keys.append((cx, cy))
+        return keys
+
+    def region(self, x0, y0, x1, y1):
+        # Celdas de [x0, x1) x [y0, y1) como (x, y, caracter), para dibujar una ventana
+        for y in range(max(0, y0), min(self.height, y1)):
+            for x in range(max(0, x0), min(self.width, x1)):
+                yield x, y, self.cell(x, y)
+
+    def solve(self, start=None, goal=None):
+        # A* sobre el mundo troceado. El estado de la busqueda tambien va por trozos: para cada trozo
+        # tocado, un byte por celda (direccion de llegada o muro) y la distancia desde el inicio.
+        # Cada trozo se lee del disco una sola vez por busqueda y ocupa unos 5 bytes por celda.
+        start = start or self.player
+        goal = goal or self.goal
+        size, width, height = self.chunk_size, self.width, self.height
+        states = {}  # (cx, cy) -> (direcciones, distancias)
+
+        def state(x, y):
+            key = (x // size, y // size)
+            found = states.get(key)
+            if found is None:
+                found = states[key] = (self.chunk(*key).translate(SEARCH_CELLS),
+                                       array('I', [UNSEEN]) * self.chunk_bytes)
+            return found
+
+        def heuristic(x, y):
+            return abs(x - goal[0]) + abs(y - goal[1])
+
+        parents, distances = state(*start)
+        offset = (start[1] % size) * size + start[0] % size
+        parents[offset] = START
+        distances[offset] = 0
+        open_set = [(heuristic(*start), 0, start[0], start[1])]
+        while open_set:
+            _, cost, x, y = heapq.heappop(open_set)
+            if (x, y) == goal:
+                return self.trace_path(states, start, goal)
+            here = states[(x // size, y // size)]
+            lx, ly = x % size, y % size
+            if cost > here[1][ly * size + lx]:
+                continue
+            for code, (dx, dy) in enumerate(DIRECTIONS, 1):
+                nx, ny = x + dx, y + dy
+                if 0 <= lx + dx < size and 0 <= ly + dy < size:
+                    # Vecino en el mismo trozo (el relleno del borde del mundo ya es muro)
+                    parents, distances = here
+                    offset = (ly + dy) * size + lx + dx
+                elif 0 <= nx < width and 0 <= ny < height:
+                    parents, distances = state(nx, ny)
+                    offset = (ny % size) * size + nx % size
+                else:
+                    continue
+                if parents[offset] != WALL and cost + 1 < distances[offset]:
+                    parents[offset] = code
+                    distances[offset] = cost + 1
+                    heapq.heappush(open_set, (cost + 1 + heuristic(nx, ny), cost + 1, nx, ny))
+        return RunPath()
+
+    def trace_path(self, states, start, goal):
+        # Recorrer las direcciones de llegada desde la meta, agrupando los pasos en tramos
+        size = self.chunk_size
+        runs = []
+        x, y = goal
+        while (x, y) != start:
+            parents = states[(x // size, y // size)][0]
+            dx, dy = DIRECTIONS[parents[(y % size) * size + x % size] - 1]
+            if runs and runs[-1][0] == dx and runs[-1][1] == dy:
+                runs[-1][2] += 1
+            else:
+                runs.append([dx, dy, 1])
+            x, y = x - dx, y - dy
+        return RunPath(start, reversed(runs))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mundos troceados: generar, convertir y resolver en streaming")
+    parser.add_argument("world", help="archivo .labt")
+    parser.add_argument("--generate", type=int, nargs=2, metavar=("ANCHO", "ALTO"), help="generar un laberinto nuevo")
+    parser.add_argument("--from-txt", help="convertir un mapa .txt")
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--max-chunks", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.generate:
+        start = time.perf_counter()
+        generate_world(args.world, *args.generate, chunk_size=args.chunk_size, seed=args.seed)
+        print(f"Generado en {time.perf_counter() - start:.2f}s")
+    elif args.from_txt:
+        convert_map(args.from_txt, args.world, args.chunk_size)
+
+    world = ChunkedMap(args.world, args.max_chunks)
+    start = time.perf_counter()
+    path = world.solve()
+    elapsed = time.perf_counter() - start
+    print(f"Mundo {world.width}x{world.height} en trozos de {world.chunk_size}: camino de {len(path)} celdas en {elapsed:.2f}s")
+    print(f"  Trozos: {len(world.chunks)}/{world.max_chunks} en memoria, {world.misses} lecturas, "
+          f"{world.hits} aciertos, {world.evictions} expulsiones")
+    world.close()
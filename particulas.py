@@ -0,0 +1,84 @@
+import random
+from array import array
+
+import pygame
+
+
+class ParticlePool:
+    # Sistema de particulas de capacidad fija guardado como estructura de arrays.
+    # Cada particula guarda su origen, velocidad y frames de nacimiento/expiracion:
+    # la posicion se obtiene como origen + velocidad * edad, asi que actualizar no
+    # recorre posiciones ni temporizadores, solo compacta las particulas expiradas.
+    def __init__(self, capacity=4096, colors=((255, 255, 255), (255, 255, 0)), radius=2):
+        self.capacity = capacity
+        self.count = 0
+        self.frame = 0
+
+        self.x = array('f', bytes(4 * capacity))
+        self.y = array('f', bytes(4 * capacity))
+        self.vx = array('f', bytes(4 * capacity))
+        self.vy = array('f', bytes(4 * capacity))
+        self.birth = array('l', [0]) * capacity
+        self.expiry = array('l', [0]) * capacity
+        self.color = array('B', bytes(capacity))
+
+        # Un sprite por color para dibujar todas las particulas con un solo blits()
+        self.radius = radius
+        self.sprites = []
+        for color in colors:
+            sprite = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, color, (radius, radius), radius)
+            self.sprites.append(sprite)
+
+    def __len__(self):
+        return self.count
+
+    def emit(self, position, amount, speed, lifetime, color_index=0):
+        # Crear particulas en una posicion; las que no caben en el pool se descartan
+        amount = min(amount, self.capacity - self.count)
+        px, py = position
+        for i in range(self.count, self.count + amount):
+            self.x[i] = px
+            self.y[i] = py
+            self.vx[i] = random.uniform(-speed, speed)
+            self.vy[i] = random.uniform(-speed, speed)
+            self.birth[i] = self.frame
+            self.expiry[i] = self.frame + lifetime
+            self.color[i] = color_index
+        self.count += amount
+
+    def update(self):
+        # Avanzar un frame y eliminar las particulas expiradas intercambiandolas con la ultima
+        self.frame += 1
+        frame = self.frame
+        expiry = self.expiry
+        i = 0
+        while i < self.count:
+            if expiry[i] <= frame:
+                last = self.count - 1
+                if i != last:
+                    self.x[i] = self.x[last]
+                    self.y[i] = self.y[last]
+                    self.vx[i] = self.vx[last]
+                    self.vy[i] = self.vy[last]
+                    self.birth[i] = self.birth[last]
+                    expiry[i] = expiry[last]
+                    self.color[i] = self.color[last]
+                self.count = last
+            else:
+                i += 1
+
+    def clear(self):
+        self.count = 0
+
+    def draw(self, surface, offset=(0, 0)):
+        # Dibujar todas las particulas vivas en una sola llamada; offset es la esquina de la camara
+        frame = self.frame
+        radius = self.radius
+        offset_x, offset_y = offset[0] + radius, offset[1] + radius
+        sprites = self.sprites
+        x, y, vx, vy, birth, color = self.x, self.y, self.vx, self.vy, self.birth, self.color
+        surface.blits([(sprites[color[i]],
+                        (int(x[i] + vx[i] * (frame - birth[i])) - offset_x,
+                         int(y[i] + vy[i] * (frame - birth[i])) - offset_y))
+                       for i in range(self.count)], False)
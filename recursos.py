@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pygame
+
+SPRITES = ['wall', 'enemy', 'goal', 'path', 'coin', 'power_up', 'player_0', 'player_1', 'player_2', 'player_3']
+
+
+class AssetManager:
+    # Recursos compartidos por todo el proceso: cada imagen y sonido se carga de disco una sola vez,
+    # aunque se creen varios Laberinto (uno por nivel). Los sprites escalados se empaquetan en un
+    # atlas convertido al formato de la pantalla, uno por tamano de celda, para que los blits no
+    # tengan que convertir pixeles en cada frame.
+    def __init__(self, directory="assets"):
+        self.directory = directory
+        self.images = {}  # Nombre -> superficie original
+        self.sounds = {}  # Nombre -> pygame.mixer.Sound
+        self.atlases = {}  # block_size -> (atlas, {nombre: subsuperficie})
+        self.music = None  # Archivo de musica que esta sonando
+        self.load_times = {}  # Recurso -> milisegundos que tardo en cargarse
+        self.lock = threading.Lock()  # load_times tambien se escribe desde el hilo de audio
+        self.audio_thread = None
+        self.audio_ready_ms = None  # Tiempo desde load_audio_async hasta tener el audio listo
+
+    def timed(self, key, load):
+        start = time.perf_counter()
+        value = load()
+        with self.lock:
+            self.load_times[key] = (time.perf_counter() - start) * 1000
+        return value
+
+    def image(self, name):
+        if name not in self.images:
+            self.images[name] = self.timed(name, lambda: pygame.image.load(f"{self.directory}/{name}.png"))
+        return self.images[name]
+
+    def sprites(self, block_size):
+        # Sprites escalados a block_size, como subsuperficies de un unico atlas
+        if block_size not in self.atlases:
+            for name in SPRITES:
+                self.image(name)  # Cargar antes para no contar dos veces su tiempo en el del atlas
+            self.atlases[block_size] = self.timed(f"atlas {block_size}px", lambda: self.build_atlas(block_size))
+        return self.atlases[block_size][1]
+
+    def build_atlas(self, block_size):
+        atlas = pygame.Surface((block_size * len(SPRITES), block_size), pygame.SRCALPHA)
+        for i, name in enumerate(SPRITES):
+            atlas.blit(pygame.transform.scale(self.image(name), (block_size, block_size)), (i * block_size, 0))
+        if pygame.display.get_surface() is not None:
+            atlas = atlas.convert_alpha()
+        sprites = {name: atlas.subsurface((i * block_size, 0, block_size, block_size)) for i, name in enumerate(SPRITES)}
+        return atlas, sprites
+
+    def sound(self, filename):
+        if filename not in self.sounds:
+            self.sounds[filename] = self.timed(filename, lambda: pygame.mixer.Sound(f"{self.directory}/{filename}"))
+        return self.sounds[filename]
+
+    def play_music(self, filename):
+        # La musica sigue sonando entre niveles: solo se carga si cambia el archivo
+        if self.music != filename:
+            self.timed(filename, lambda: pygame.mixer.music.load(f"{self.directory}/{filename}"))
+            pygame.mixer.music.play(-1)
+            self.music = filename
+
+    def load_audio_async(self, music, sounds):
+        # Iniciar el mezclador, decodificar los sonidos y arrancar la musica en un hilo aparte,
+        # para no retrasar el primer frame. Solo se hace una vez por proceso.
+        if self.audio_thread is None:
+            self.audio_thread = threading.Thread(target=self.load_audio, args=(music, sounds), daemon=True)
+            self.audio_thread.start()
+
+    def load_audio(self, music, sounds):
+        start = time.perf_counter()
+        try:
+            self.timed('mixer', pygame.mixer.init)
+            for filename in sounds:
+                self.sound(filename)
+            self.play_music(music)
+        except pygame.error as error:
+            print(f"Audio no disponible: {error}")
+        self.audio_ready_ms = (time.perf_counter() - start) * 1000
+
+    def total_load_ms(self):
+        with self.lock:
+            return sum(self.load_times.values())
+
+    def report(self):
+        # Tiempos de carga, de mas lento a mas rapido
+        with self.lock:
+            load_times = sorted(self.load_times.items(), key=lambda item: -item[1])
+        for key, elapsed in load_times:
+            print(f"  {key}: {elapsed:.1f} ms")
+        print(f"  Total: {self.total_load_ms():.1f} ms")
+
+
+ASSETS = AssetManager()
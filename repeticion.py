@@ -0,0 +1,235 @@
+import argparse
+import glob
+import os
+import time
+from collections import namedtuple
+
+from caminos import RunPath
+from laberinto2 import Laberinto, REPLAY_MCTS_ROLLOUTS, TICK_MS
+
+# Formato binario de repeticiones (.rep):
+#   cabecera: MAGIC, version, y como varints nivel, semilla, resultado, puntuacion, vidas y ticks
+#   registros: [direccion (0-8), varint repeticiones] por cada tramo de ticks con la misma entrada,
+#              [TOGGLE_AI, algoritmo, ruta de la IA] cuando se activa o desactiva la IA,
+#              o [SELECT_AI, algoritmo] cuando se elige otro algoritmo (version 2)
+# Direccion = (dx + 1) * 3 + (dy + 1), asi que cabe cualquier combinacion de flechas.
+MAGIC = b'LABR'
+VERSION = 2
+TOGGLE_AI = 0xFF
+SELECT_AI = 0xFE
+OUTCOMES = [None, 'win', 'lose']
+
+Replay = namedtuple('Replay', ['level', 'seed', 'outcome', 'score', 'lives', 'ticks', 'events'])
+
+
+def direction_code(dx, dy):
+    return (dx + 1) * 3 + (dy + 1)
+
+
+def code_direction(code):
+    return code // 3 - 1, code % 3 - 1
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def write_name(out, name):
+    name = (name or '').encode()
+    write_varint(out, len(name))
+    out += name
+
+
+def read_name(data, offset):
+    length, offset = read_varint(data, offset)
+    return bytes(data[offset:offset + length]).decode() or None, offset + length
+
+
+def encode_path(out, path, block_size):
+    # RunPath como [n tramos + 1, x, y, (direccion, longitud)...] con la celda inicial; 0 si esta vacio
+    write_varint(out, len(path.runs) + 1 if path else 0)
+    if path:
+        write_varint(out, path.head[0] // block_size)
+        write_varint(out, path.head[1] // block_size)
+        for dx, dy, count in path.runs:
+            out.append(direction_code(dx // block_size, dy // block_size))
+            write_varint(out, count)
+
+
+def decode_path(data, offset, block_size):
+    count, offset = read_varint(data, offset)
+    if not count:
+        return RunPath(), offset
+    x, offset = read_varint(data, offset)
+    y, offset = read_varint(data, offset)
+    runs = []
+    for _ in range(count - 1):
+        dx, dy = code_direction(data[offset])
+        length, offset = read_varint(data, offset + 1)
+        runs.append((dx * block_size, dy * block_size, length))
+    return RunPath((x * block_size, y * block_size), runs), offset
+
+
+class ReplayRecorder:
+    # Graba una partida desde el tick 0 hasta que termina el nivel: las entradas de cada tick
+    # agrupadas en tramos y cada activacion de la IA con la ruta que calculo
+    def __init__(self, level, seed, block_size):
+        self.level = level
+        self.seed = seed
+        self.block_size = block_size
+        self.events = bytearray()
+        self.move = None
+        self.count = 0
+
+    def flush_moves(self):
+        if self.count:
+            self.events.append(direction_code(*self.move))
+            write_varint(self.events, self.count)
+            self.count = 0
+
+    def record_tick(self, move):
+        if move != self.move:
+            self.flush_moves()
+            self.move = move
+        self.count += 1
+
+    def record_toggle(self, algorithm, path):
+        self.flush_moves()
+        self.events.append(TOGGLE_AI)
+        write_name(self.events, algorithm)
+        encode_path(self.events, path, self.block_size)
+
+    def record_select(self, algorithm):
+        self.flush_moves()
+        self.events.append(SELECT_AI)
+        write_name(self.events, algorithm)
+
+    def to_bytes(self, game):
+        # Cabecera con el resultado de la partida seguida de los registros
+        self.flush_moves()
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        for value in (self.level, self.seed, OUTCOMES.index(game.outcome), game.score, game.lives, game.tick):
+            write_varint(out, value)
+        return bytes(out + self.events)
+
+    def save(self, game, filepath):
+        with open(filepath, 'wb') as file:
+            file.write(self.to_bytes(game))
+
+
+def load_replay(data, block_size=40):
+    if data[:4] != MAGIC or data[4] not in (1, VERSION):
+        raise ValueError("No es una repeticion valida")
+    offset = 5
+    header = []
+    for _ in range(6):
+        value, offset = read_varint(data, offset)
+        header.append(value)
+    level, seed, outcome, score, lives, ticks = header
+
+    # Eventos: ('move', (dx, dy), n ticks), ('toggle', algoritmo, ruta) o ('select', algoritmo)
+    events = []
+    while offset < len(data):
+        code = data[offset]
+        if code == TOGGLE_AI:
+            algorithm, offset = read_name(data, offset + 1)
+            path, offset = decode_path(data, offset, block_size)
+            events.append(('toggle', algorithm, path))
+        elif code == SELECT_AI:
+            algorithm, offset = read_name(data, offset + 1)
+            events.append(('select', algorithm))
+        else:
+            count, offset = read_varint(data, offset + 1)
+            events.append(('move', code_direction(code), count))
+    return Replay(level, seed, OUTCOMES[outcome], score, lives, ticks, events)
+
+
+def verify(replay):
+    # Volver a jugar la repeticion sin ventana y comprobar que se llega al mismo resultado.
+    # Devuelve la lista de discrepancias (vacia si todo coincide).
+    game = Laberinto(replay.level, headless=True, seed=replay.seed)
+    game.mcts_rollouts = REPLAY_MCTS_ROLLOUTS  # Igual que al grabar
+    errors = []
+    for event in replay.events:
+        if event[0] == 'toggle':
+            _, algorithm, path = event
+            game.ai_algorithm = algorithm
+            game.toggle_ai_solving()
+            if game.ai_solving and game.ai_path != path:
+                errors.append(f"ruta de {algorithm} distinta en el tick {game.tick}")
+        elif event[0] == 'select':
+            game.ai_algorithm = event[1]
+        else:
+            _, move, count = event
+            while count and game.running:
+                # Saltar de golpe los ticks en los que no toca mover a nadie ni caduca nada
+                idle = min(game.next_event_tick(move) - game.tick - 1, count)
+                if idle:
+                    game.skip_ticks(idle)
+                    count -= idle
+                    continue
+                game.step(move)
+                count -= 1
+
+    for field in ('outcome', 'score', 'lives'):
+        if getattr(game, field) != getattr(replay, field):
+            errors.append(f"{field}: {getattr(game, field)} != {getattr(replay, field)}")
+    if game.tick != replay.ticks:
+        errors.append(f"ticks: {game.tick} != {replay.ticks}")
+    return errors
+
+
+def record_games(directory, games, level, algorithm):
+    # Grabar partidas headless de la IA (como simulacion.simulate_game) en directory
+    os.makedirs(directory, exist_ok=True)
+    for seed in range(games):
+        game = Laberinto(level, headless=True, seed=seed)
+        game.start_recording()
+        game.ai_algorithm = algorithm
+        game.toggle_ai_solving()
+        max_ticks = int(2 * game.time_limit * 1000 / TICK_MS)
+        while game.running and game.tick < max_ticks:
+            game.step()
+        game.recorder.save(game, os.path.join(directory, f"nivel{level}_{algorithm.replace('*', 'star')}_{seed}.rep"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grabar y verificar repeticiones de partidas")
+    parser.add_argument("directory", help="carpeta con los archivos .rep")
+    parser.add_argument("--record", type=int, default=0, help="grabar antes N partidas de la IA")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--algorithm", default='BFS')
+    args = parser.parse_args()
+
+    if args.record:
+        record_games(args.directory, args.record, args.level, args.algorithm)
+
+    paths = sorted(glob.glob(os.path.join(args.directory, "*.rep")))
+    start = time.perf_counter()
+    total_bytes = failures = 0
+    for path in paths:
+        with open(path, 'rb') as file:
+            data = file.read()
+        total_bytes += len(data)
+        errors = verify(load_replay(data))
+        if errors:
+            failures += 1
+            print(f"{os.path.basename(path)}: {'; '.join(errors)}")
+    elapsed = time.perf_counter() - start
+    print(f"{len(paths)} repeticiones verificadas en {elapsed:.2f}s ({len(paths) / elapsed if elapsed else 0:.0f}/s), "
+          f"{failures} con discrepancias, {total_bytes / max(1, len(paths)):.0f} bytes de media")
@@ -0,0 +1,221 @@
+import math
+from collections import deque
+
+from caminos import RunPath
+
+
+class RoutePlanner:
+    # Planificador con varios objetivos: elige que monedas y power-ups recoger, y en que orden,
+    # antes de llegar a la meta sin pasarse del tiempo restante del nivel.
+    # Hace un BFS desde el jugador, cada objeto y la meta para obtener la matriz de distancias
+    # (el del jugador, como los demas solvers, evita las celdas a safety_margin o menos de un enemigo);
+    # el orden se resuelve de forma exacta (Held-Karp) con pocos objetos y con vecino mas
+    # cercano + 2-opt con muchos.
+    def __init__(self, game, exact_limit=10, coin_value=10, power_up_value=5, time_margin=0.9):
+        self.game = game
+        self.exact_limit = exact_limit
+        self.coin_value = coin_value
+        self.power_up_value = power_up_value
+        self.time_margin = time_margin  # Fraccion del tiempo restante que se permite gastar
+
+        self.width = game.grid_width
+        self.block_size = game.block_size
+        self.moves = game.cell_moves()
+        self.last_stats = {}
+
+    def cell(self, pos):
+        return (pos[1] // self.block_size) * self.width + pos[0] // self.block_size
+
+    def position(self, cell):
+        return ((cell % self.width) * self.block_size, (cell // self.width) * self.block_size)
+
+    def bfs(self, source, danger=None, margin=0, stop=None):
+        # Distancias desde source y padre de cada celda en el arbol BFS (apunta hacia source).
+        # Con danger se saltan las celdas a margin o menos de un enemigo. A stop se puede llegar
+        # pero no se pasa por ella (la meta: tocarla termina el nivel)
+        distances = [math.inf] * len(self.moves)
+        parents = [-1] * len(self.moves)
+        distances[source] = 0
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            if current == stop:
+                continue
+            for neighbor in self.moves[current]:
+                if distances[neighbor] == math.inf and (danger is None or danger[neighbor] > margin):
+                    distances[neighbor] = distances[current] + 1
+                    parents[neighbor] = current
+                    queue.append(neighbor)
+        return distances, parents
+
+    def step_budget(self):
+        # Pasos que caben en el tiempo restante del nivel
+        game = self.game
+        remaining_ms = game.time_limit * 1000 - (game.now() - game.start_time)
+        return int(self.time_margin * remaining_ms // game.interval_ms(game.move_delay))
+
+    def route_length(self, dist, order, goal):
+        length, current = 0, 0
+        for node in order:
+            length += dist[current][node]
+            current = node
+        return length + dist[current][goal]
+
+    def solve_exact(self, dist, values, budget):
+        # Held-Karp con mascara de bits: best[mask][j] = distancia minima desde el inicio
+        # recogiendo los objetos de mask y terminando en el objeto j
+        n = len(values)
+        goal = n + 1
+        full = 1 << n
+        best = [[math.inf] * n for _ in range(full)]
+        parent = [[-1] * n for _ in range(full)]
+        for j in range(n):
+            best[1 << j][j] = dist[0][j + 1]
+
+        mask_values = [0] * full
+        for mask in range(1, full):
+            low = (mask & -mask).bit_length() - 1
+            mask_values[mask] = mask_values[mask & (mask - 1)] + values[low]
+
+        for mask in range(1, full):
+            row = best[mask]
+            for j in range(n):
+                length = row[j]
+                if length > budget:
+                    continue  # Ya no puede llegar a la meta a tiempo
+                for k in range(n):
+                    if mask & (1 << k):
+                        continue
+                    candidate = length + dist[j + 1][k + 1]
+                    next_mask = mask | (1 << k)
+                    if candidate < best[next_mask][k]:
+                        best[next_mask][k] = candidate
+                        parent[next_mask][k] = j
+
+        # Mejor combinacion: mas valor y, a igualdad, menos pasos
+        best_key, best_end = (0, -dist[0][goal]), None
+        for mask in range(1, full):
+            for j in range(n):
+                total = best[mask][j] + dist[j + 1][goal]
+                if total <= budget and (mask_values[mask], -total) > best_key:
+                    best_key, best_end = (mask_values[mask], -total), (mask, j)
+
+        order = []
+        while best_end is not None:
+            mask, j = best_end
+            order.append(j + 1)
+            previous = parent[mask][j]
+            best_end = (mask ^ (1 << j), previous) if previous >= 0 else None
+        return order[::-1]
+
+    def two_opt(self, dist, order, goal):
+        # Invertir tramos mientras se acorte la ruta (inicio y meta fijos). Invertir route[i..j]
+        # solo cambia dos aristas, asi que cada candidato se evalua en O(1)
+        route = [0] + order + [goal]
+        improved = True
+        while improved:
+            improved = False
+            for i in range(1, len(route) - 2):
+                for j in range(i + 1, len(route) - 1):
+                    a, b, c, d = route[i - 1], route[i], route[j], route[j + 1]
+                    if dist[a][c] + dist[b][d] < dist[a][b] + dist[c][d]:
+                        route[i:j + 1] = route[i:j + 1][::-1]
+                        improved = True
+        return route[1:-1]
+
+    def solve_heuristic(self, dist, values, budget):
+        # Vecino mas cercano + 2-opt; si la ruta no cabe en el tiempo se descartan los objetos
+        # que mas pasos cuestan por punto hasta que quepa y se vuelve a optimizar una sola vez
+        n = len(values)
+        goal = n + 1
+        pending = set(range(1, n + 1))
+        order, current = [], 0
+        while pending:
+            current = min(pending, key=lambda node: dist[current][node])
+            order.append(current)
+            pending.remove(current)
+        order = self.two_opt(dist, order, goal)
+
+        length = self.route_length(dist, order, goal)
+        if length <= budget:
+            return order
+        route = [0] + order + [goal]
+        dropped = []
+        while len(route) > 2 and length > budget:
+            # Pasos que se ahorran al quitar route[i]: solo cambian sus dos aristas
+            def cost_per_value(i):
+                saved = dist[route[i - 1]][route[i]] + dist[route[i]][route[i + 1]] - dist[route[i - 1]][route[i + 1]]
+                return saved / max(values[route[i] - 1], 1)
+
+            i = max(range(1, len(route) - 1), key=cost_per_value)
+            length -= dist[route[i - 1]][route[i]] + dist[route[i]][route[i + 1]] - dist[route[i - 1]][route[i + 1]]
+            dropped.append(route.pop(i))
+        route = [0] + self.two_opt(dist, route[1:-1], goal) + [goal]
+        length = self.route_length(dist, route[1:-1], goal)
+
+        # Con los pasos que ha liberado 2-opt, volver a meter objetos descartados donde menos cuesten
+        for node in reversed(dropped):
+            extra, i = min((dist[route[i - 1]][node] + dist[node][route[i]] - dist[route[i - 1]][route[i]], i)
+                           for i in range(1, len(route)))
+            if length + extra <= budget:
+                route.insert(i, node)
+                length += extra
+        return route[1:-1]
+
+    def plan(self):
+        # Ruta en pixeles desde el jugador hasta la meta pasando por los objetos elegidos
+        game = self.game
+        start = self.cell(game.player.topleft)
+        goal_cell = self.cell(game.goal.topleft)
+        items = [(self.cell(pos), self.coin_value) for pos in game.collectibles]
+        items += [(self.cell(pos), self.power_up_value) for pos in game.power_ups]
+
+        # El primer tramo se planifica con los enemigos de ahora; los siguientes, sobre los muros
+        if game.danger_dirty:
+            game.update_danger_field()
+        start_distances, start_parents = self.bfs(start, game.danger, game.safety_margin, goal_cell)
+        if start_distances[goal_cell] == math.inf:
+            # Un enemigo corta el paso: se planifica sobre los muros y se replanificara al acercarse
+            start_distances, start_parents = self.bfs(start, stop=goal_cell)
+        goal_distances, goal_parents = self.bfs(goal_cell)
+        if start_distances[goal_cell] == math.inf:
+            return RunPath()  # La meta no es alcanzable
+
+        # Solo interesan los objetos alcanzables sin pasar por la meta
+        items = [(cell, value) for cell, value in items if start_distances[cell] < math.inf]
+        trees = ([(start_distances, None)] + [self.bfs(cell, stop=goal_cell) for cell, _ in items]
+                 + [(goal_distances, goal_parents)])
+        nodes = [start] + [cell for cell, _ in items] + [goal_cell]
+        dist = [[tree[0][node] for node in nodes] for tree in trees]
+        values = [value for _, value in items]
+
+        budget = self.step_budget()
+        if len(items) <= self.exact_limit:
+            order = self.solve_exact(dist, values, budget)
+            method = 'Held-Karp'
+        else:
+            order = self.solve_heuristic(dist, values, budget)
+            method = '2-opt'
+
+        # El primer tramo sale del arbol BFS del jugador; el resto sigue el arbol BFS del destino de cada tramo
+        legs = order + [len(nodes) - 1]
+        current, first_leg = nodes[legs[0]], []
+        while current != start:
+            first_leg.append(current)
+            current = start_parents[current]
+        path = [start] + first_leg[::-1]
+        for node in legs[1:]:
+            parents = trees[node][1]
+            current = path[-1]
+            while current != nodes[node]:
+                current = parents[current]
+                path.append(current)
+
+        self.last_stats = {
+            'method': method,
+            'items': len(order),
+            'value': sum(values[node - 1] for node in order),
+            'steps': len(path) - 1,
+            'budget': budget,
+        }
+        return RunPath.from_positions(self.position(cell) for cell in path)
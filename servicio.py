@@ -0,0 +1,338 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+
+from laberinto2 import Laberinto
+
+# Metodo de Laberinto de cada algoritmo: se llaman directamente, sin pasar por la IA interactiva
+SOLVERS = {
+    'DFS': 'solve_maze_dfs', 'BFS': 'solve_maze_bfs', 'Greedy': 'solve_maze_greedy', 'A*': 'solve_maze_astar',
+    'ST-A*': 'solve_maze_spacetime', 'Monedas': 'solve_maze_route', 'Dijkstra': 'solve_maze_dijkstra',
+}
+ALGORITHMS = list(SOLVERS)
+LATENCY_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]  # Limites superiores en ms
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 422: 'Unprocessable Entity', 503: 'Service Unavailable'}
+
+# Partida headless reutilizada por cada proceso del pool para cargar mapas y lanzar los solvers
+worker_game = None
+
+
+def start_worker():
+    # Crear la partida del proceso; el servicio lo lanza en todos los procesos al arrancar
+    global worker_game
+    if worker_game is None:
+        worker_game = Laberinto(1, headless=True, seed=0)
+    return os.getpid()
+
+
+def solve_job(level, map_text, algorithm):
+    # Resolver un mapa (nivel del disco o texto recibido) con un algoritmo, en un proceso del pool
+    start = time.perf_counter()
+    try:
+        start_worker()
+        game = worker_game
+        if map_text is not None:
+            lines = [line.strip() for line in map_text.splitlines()]
+            if not any('P' in line for line in lines) or not any('E' in line for line in lines):
+                return {'error': "El mapa necesita un jugador (P) y una meta (E)"}
+            game.parse_map(lines)
+        else:
+            game.load_map(f"maps/level{level}.txt")
+        path = getattr(game, SOLVERS[algorithm])()
+    except Exception as error:
+        # Un mapa roto no debe tumbar el resto del lote
+        return {'error': f"{type(error).__name__}: {error}"}
+
+    solve_ms = (time.perf_counter() - start) * 1000
+    if not path:
+        return {'algorithm': algorithm, 'found': False, 'solve_ms': solve_ms}
+    # La ruta viaja igual que se guarda: celda inicial + tramos de direcciones (en celdas)
+    block_size = game.block_size
+    return {
+        'algorithm': algorithm,
+        'found': True,
+        'steps': len(path) - 1,
+        'path': {
+            'start': [path.head[0] // block_size, path.head[1] // block_size],
+            'runs': [[dx // block_size, dy // block_size, count] for dx, dy, count in path.runs],
+        },
+        'solve_ms': solve_ms,
+    }
+
+
+def solve_batch(jobs):
+    # Un envio al pool resuelve varios trabajos seguidos, para repartir el coste de comunicacion
+    return [solve_job(*job) for job in jobs]
+
+
+class Overloaded(Exception):
+    pass
+
+
+class SolveService:
+    # Servicio HTTP/JSON local sobre asyncio:
+    #   POST /solve {"level": n | "map": "...", "algorithm": "BFS"} -> ruta y estadisticas
+    #                (422 con "found": false si el mapa no tiene camino)
+    #   GET /stats -> contadores e histograma de latencias
+    # Las peticiones identicas en curso comparten un solo calculo, los trabajos se agrupan en lotes
+    # para el pool de procesos y, si hay demasiados pendientes, se responde 503 (control de admision).
+    def __init__(self, workers=None, max_pending=64, batch_size=16, batch_window_ms=2.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.batch_window = batch_window_ms / 1000
+        self.in_flight = {}  # Clave de la peticion -> future con el resultado
+        self.queue = None
+        self.batcher = None
+        self.server = None
+
+        self.requests = 0
+        self.solved = 0
+        self.not_found = 0  # Mapas sin camino (422)
+        self.coalesced = 0
+        self.rejected = 0
+        self.errors = 0
+        self.batches = 0
+        self.computed = 0  # Trabajos enviados al pool (sin contar las peticiones agrupadas)
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_total = 0.0
+
+    async def start(self, host='127.0.0.1', port=8765):
+        # Arrancar todos los procesos antes de aceptar conexiones: asi no heredan sockets de clientes
+        # y la primera peticion no paga la creacion del proceso
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, start_worker) for _ in range(self.workers)))
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.create_task(self.run_batcher())
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        self.pool.shutdown()
+
+    def request_job(self, request):
+        # Validar la peticion y devolver (clave, trabajo)
+        algorithm = request.get('algorithm', 'BFS')
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Algoritmo desconocido: {algorithm}")
+        level, map_text = request.get('level'), request.get('map')
+        if (level is None) == (map_text is None):
+            raise ValueError("Hay que indicar 'level' o 'map'")
+        if level is not None:
+            if not isinstance(level, int) or level < 1:
+                raise ValueError("'level' debe ser un entero positivo")
+            return ('level', level, algorithm), (level, None, algorithm)
+        if not isinstance(map_text, str):
+            raise ValueError("'map' debe ser el texto del mapa")
+        return ('map', hashlib.sha1(map_text.encode()).hexdigest(), algorithm), (None, map_text, algorithm)
+
+    async def solve(self, request):
+        key, job = self.request_job(request)
+        future = self.in_flight.get(key)
+        if future is not None:
+            # Peticion identica en curso: se espera a su resultado
+            self.coalesced += 1
+            return dict(await asyncio.shield(future), coalesced=True)
+        if len(self.in_flight) >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded()
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        self.queue.put_nowait((key, job))
+        return dict(await asyncio.shield(future), coalesced=False)
+
+    async def run_batcher(self):
+        # Esperar un trabajo, dar batch_window para que lleguen mas y enviarlos juntos al pool
+        while True:
+            batch = [await self.queue.get()]
+            if self.batch_window:
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            asyncio.create_task(self.run_batch(batch))
+
+    async def run_batch(self, batch):
+        self.batches += 1
+        self.computed += len(batch)
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.pool, solve_batch, [job for _, job in batch])
+        except Exception as error:
+            results = [{'error': f"Fallo del proceso de calculo: {error}"}] * len(batch)
+        for (key, _), result in zip(batch, results):
+            self.in_flight.pop(key).set_result(result)
+
+    def record_latency(self, elapsed_ms):
+        self.histogram[bisect_left(LATENCY_BUCKETS, elapsed_ms)] += 1
+        self.latency_total += elapsed_ms
+
+    def percentile(self, fraction):
+        # Estimacion por el histograma: limite superior del cubo donde cae el percentil
+        count = sum(self.histogram)
+        if not count:
+            return None
+        seen = 0
+        for i, bucket_count in enumerate(self.histogram):
+            seen += bucket_count
+            if seen >= fraction * count:
+                return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else None  # Fuera del ultimo cubo
+
+    def stats(self):
+        answered = sum(self.histogram)
+        labels = [f"<={limit}ms" for limit in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}ms"]
+        return {
+            'requests': self.requests,
+            'solved': self.solved,
+            'not_found': self.not_found,
+            'coalesced': self.coalesced,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'in_flight': len(self.in_flight),
+            'batches': self.batches,
+            'computed': self.computed,
+            'average_batch': self.computed / self.batches if self.batches else 0,
+            'latency_ms': dict(zip(labels, self.histogram)),
+            'latency_mean_ms': self.latency_total / answered if answered else None,
+            'latency_p50_ms': self.percentile(0.5),
+            'latency_p99_ms': self.percentile(0.99),
+        }
+
+    async def handle(self, reader, writer):
+        start = time.perf_counter()
+        status, payload, timed = 400, {'error': "Peticion mal formada"}, False
+        try:
+            method, target, _ = (await reader.readline()).decode().split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode().partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+            if method == 'GET' and target == '/stats':
+                status, payload = 200, self.stats()
+            elif method == 'POST' and target == '/solve':
+                self.requests += 1
+                timed = True
+                try:
+                    request = json.loads(body or b'{}')
+                    if not isinstance(request, dict):
+                        raise ValueError("Se esperaba un objeto JSON")
+                    payload = await self.solve(request)
+                    if 'error' in payload:
+                        status = 400
+                    else:
+                        status = 200 if payload['found'] else 422
+                except Overloaded:
+                    status, payload = 503, {'error': "Demasiadas peticiones pendientes"}
+                except ValueError as error:
+                    status, payload = 400, {'error': str(error)}
+                if status == 200:
+                    self.solved += 1
+                elif status == 422:
+                    self.not_found += 1
+                elif status == 400:
+                    self.errors += 1
+            else:
+                status, payload = 404, {'error': "Ruta desconocida"}
+        except (ValueError, asyncio.IncompleteReadError):
+            pass
+
+        if timed:
+            self.record_latency((time.perf_counter() - start) * 1000)
+        data = json.dumps(payload).encode()
+        extra = "Retry-After: 1\r\n" if status == 503 else ""
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n{extra}Connection: close\r\n\r\n".encode() + data)
+        try:
+            await writer.drain()
+            writer.write_eof()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def http_request(host, port, method, target, payload=None):
+    # Cliente HTTP minimo para probar el servicio en local
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode().partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    data = await reader.readexactly(length)
+    writer.close()
+    return status, json.loads(data)
+
+
+async def load_test(host, port, requests, concurrency, levels, seed=0):
+    # Lanzar peticiones mezcladas (niveles y algoritmos al azar) con una concurrencia fija
+    rng = random.Random(seed)
+    jobs = [{'level': rng.choice(levels), 'algorithm': rng.choice(ALGORITHMS)} for _ in range(requests)]
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = {}
+
+    async def send(job):
+        async with semaphore:
+            status, _ = await http_request(host, port, 'POST', '/solve', job)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(job) for job in jobs))
+    elapsed = time.perf_counter() - start
+    print(f"{requests} peticiones en {elapsed:.2f}s ({requests / elapsed:.0f}/s), respuestas: {statuses}")
+    _, stats = await http_request(host, port, 'GET', '/stats')
+    print(json.dumps(stats, indent=2))
+
+
+async def main(args):
+    service = SolveService(args.workers, args.max_pending, args.batch_size, args.batch_window)
+    await service.start(args.host, args.port)
+    print(f"Servicio de resolucion en http://{args.host}:{args.port}")
+    try:
+        if args.load_test:
+            await load_test(args.host, args.port, args.load_test, args.concurrency, args.levels)
+        else:
+            await service.server.serve_forever()
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio local de resolucion de laberintos (HTTP/JSON)")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument("--max-pending", type=int, default=64, help="calculos pendientes antes de responder 503")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--batch-window", type=float, default=2.0, help="ms de espera para agrupar trabajos")
+    parser.add_argument("--load-test", type=int, default=0, help="lanzar N peticiones contra el servicio y salir")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--levels", type=int, nargs='+', default=[1, 2, 3, 4, 5])
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,87 @@
+import argparse
+import time
+
+from laberinto2 import Laberinto, TICK_MS
+from recursos import ASSETS
+
+
+def simulate_game(level, algorithm='BFS', seed=None, max_ticks=None):
+    # Jugar un nivel completo sin ventana ni sonido, con la IA resolviendolo
+    game = Laberinto(level, headless=True, seed=seed)
+    game.ai_algorithm = algorithm
+    game.toggle_ai_solving()
+
+    if max_ticks is None:
+        # Limite de seguridad: el doble del tiempo del nivel (los power-ups pueden ampliarlo)
+        max_ticks = int(2 * game.time_limit * 1000 / TICK_MS)
+    while game.running and game.tick < max_ticks:
+        game.step()
+
+    return {
+        'outcome': game.outcome,
+        'replans': game.replans,
+        'score': game.score,
+        'lives': game.lives,
+        'ticks': game.tick,
+    }
+
+
+def benchmark(games, level, algorithm):
+    # Medir cuantas partidas simuladas por minuto se pueden jugar
+    start = time.perf_counter()
+    results = [simulate_game(level, algorithm, seed=seed) for seed in range(games)]
+    elapsed = time.perf_counter() - start
+
+    wins = sum(result['outcome'] == 'win' for result in results)
+    ticks = sum(result['ticks'] for result in results)
+    print(f"Nivel {level} ({algorithm}): {games} partidas en {elapsed:.2f}s")
+    print(f"  {games / elapsed * 60:.0f} partidas/minuto, {ticks / elapsed:.0f} ticks/s")
+    print(f"  Victorias: {wins}/{games}, puntuacion media: {sum(result['score'] for result in results) / games:.1f}")
+    print(f"  Replanificaciones: {sum(result['replans'] for result in results)}")
+    return results
+
+
+def benchmark_snapshots(level, count):
+    # Medir cuantos ciclos de snapshot/restore por segundo admite una partida
+    game = Laberinto(level, headless=True, seed=0)
+    start = time.perf_counter()
+    for _ in range(count):
+        state = game.snapshot()
+        game.step()
+        game.restore(state)
+    elapsed = time.perf_counter() - start
+    print(f"Nivel {level}: {count / elapsed:.0f} snapshot+restore/s")
+
+
+def benchmark_startup(level, count):
+    # Medir el tiempo hasta el primer frame con ventana (la primera vez en frio, el resto con recursos en cache)
+    startup_times = []
+    for _ in range(count):
+        game = Laberinto(level)
+        game.draw_instructions()
+        startup_times.append(game.startup_ms)
+    ASSETS.audio_thread.join()
+    print(f"Nivel {level}: primer frame en {startup_times[0]:.1f} ms en frio", end="")
+    if count > 1:
+        print(f", {sum(startup_times[1:]) / (count - 1):.1f} ms de media con cache", end="")
+    print()
+    if ASSETS.audio_ready_ms is not None:
+        print(f"  Audio listo en segundo plano tras {ASSETS.audio_ready_ms:.1f} ms")
+    game.ensure_assets()
+    ASSETS.report()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulacion headless de partidas del laberinto")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--algorithm", default='BFS', choices=['DFS', 'BFS', 'Greedy', 'A*', 'MCTS', 'ST-A*', 'Monedas', 'Dijkstra'])
+    parser.add_argument("--snapshots", type=int, default=0, help="medir tambien N ciclos de snapshot/restore")
+    parser.add_argument("--startup", type=int, default=0,
+                        help="medir tambien el arranque con ventana N veces (requiere pantalla o SDL_VIDEODRIVER=dummy)")
+    args = parser.parse_args()
+    benchmark(args.games, args.level, args.algorithm)
+    if args.snapshots:
+        benchmark_snapshots(args.level, args.snapshots)
+    if args.startup:
+        benchmark_startup(args.level, args.startup)